@@ -1,6 +1,7 @@
 
+import re
 import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class AIProcessor:
     def __init__(self):
@@ -26,6 +27,55 @@ class AIProcessor:
             "Explain Shakespeare's writing style"
         ]
 
+        # Assistant knowledge base, checked in order; the first topic whose keywords match wins
+        self.assistant_topics = {
+            'photosynthesis': {
+                'keywords': ['photosynthesis', 'plant', 'chlorophyll'],
+                'response': "Photosynthesis is the process by which plants convert light energy into chemical energy. Plants use chlorophyll to capture sunlight, combine carbon dioxide from the air with water from the roots, and produce glucose and oxygen. The equation is: 6CO₂ + 6H₂O + light energy → C₆H₁₂O₆ + 6O₂. This process is essential for life on Earth as it produces oxygen and forms the base of food chains."
+            },
+            'machine_learning': {
+                'keywords': ['machine learning', 'ai', 'artificial intelligence'],
+                'response': "Machine Learning is a subset of artificial intelligence that enables computers to learn and make decisions from data without being explicitly programmed. It works by identifying patterns in data and using these patterns to make predictions. Common types include supervised learning (learning from labeled examples), unsupervised learning (finding hidden patterns), and reinforcement learning (learning through trial and error)."
+            },
+            'quadratic_equations': {
+                'keywords': ['quadratic', 'equation', 'algebra'],
+                'response': "A quadratic equation has the form ax² + bx + c = 0. To solve it, you can use: 1) Factoring (if possible), 2) Completing the square, or 3) The quadratic formula: x = [-b ± √(b² - 4ac)] / 2a. The discriminant (b² - 4ac) tells you about the solutions: positive = two real solutions, zero = one solution, negative = no real solutions."
+            },
+            'water_cycle': {
+                'keywords': ['water cycle', 'evaporation', 'precipitation'],
+                'response': "The water cycle is Earth's continuous process of water movement. It includes: 1) Evaporation - water from oceans/lakes becomes vapor, 2) Condensation - vapor cools and forms clouds, 3) Precipitation - water falls as rain/snow, 4) Collection - water gathers in bodies of water, 5) Transpiration - plants release water vapor. This cycle is powered by solar energy and gravity."
+            },
+            'relativity': {
+                'keywords': ['relativity', 'einstein', 'space', 'time'],
+                'response': "Einstein's Theory of Relativity consists of two parts: Special Relativity (1905) shows that space and time are linked as spacetime, and nothing travels faster than light. General Relativity (1915) describes gravity as the curvature of spacetime caused by mass and energy. Key insights include time dilation, length contraction, and the famous equation E=mc²."
+            },
+            'dna_replication': {
+                'keywords': ['dna', 'replication', 'genetics'],
+                'response': "DNA replication is the process of copying DNA before cell division. Steps: 1) Helicase unwinds the double helix, 2) DNA polymerase adds complementary nucleotides (A with T, G with C), 3) The leading strand is synthesized continuously, while the lagging strand is made in fragments (Okazaki fragments), 4) Ligase joins the fragments. This ensures each new cell has identical genetic information."
+            },
+            'programming': {
+                'keywords': ['programming', 'coding', 'algorithm'],
+                'response': "Programming fundamentals include: 1) Variables (storing data), 2) Data types (numbers, text, booleans), 3) Control structures (if/else, loops), 4) Functions (reusable code blocks), 5) Arrays/Lists (storing multiple values), 6) Object-oriented concepts (classes, objects), 7) Problem-solving approach (breaking problems into smaller parts), 8) Debugging (finding and fixing errors)."
+            },
+            'shakespeare': {
+                'keywords': ['shakespeare', 'literature', 'writing'],
+                'response': "Shakespeare's writing style features: 1) Iambic pentameter (rhythmic pattern), 2) Rich metaphors and imagery, 3) Wordplay and puns, 4) Soliloquies revealing inner thoughts, 5) Complex characters with psychological depth, 6) Themes of love, power, betrayal, and human nature, 7) Invented many words still used today, 8) Blank verse and rhyming couplets for different effects."
+            },
+            'calculus': {
+                'keywords': ['calculus', 'derivative', 'integral'],
+                'response': "Calculus studies continuous change through derivatives and integrals. Derivatives measure rates of change (slope of a curve), while integrals measure accumulation (area under a curve). Key concepts include limits, the fundamental theorem of calculus (connecting derivatives and integrals), and applications in physics, engineering, and economics."
+            },
+            'geometry': {
+                'keywords': ['geometry', 'triangle', 'circle'],
+                'response': "Geometry studies shapes, sizes, and spatial relationships. Key concepts include: points, lines, angles, polygons, circles, and three-dimensional shapes. Important theorems include Pythagorean theorem (a² + b² = c²), properties of similar triangles, circle theorems, and formulas for area and volume."
+            }
+        }
+        # Keywords match at the start of a word, so 'ai' does not fire on "explain" or "again"
+        self.topic_patterns = {
+            topic: re.compile(r'\b(?:' + '|'.join(re.escape(word) for word in entry['keywords']) + ')')
+            for topic, entry in self.assistant_topics.items()
+        }
+
     def get_educational_quotes(self) -> List[str]:
         """Return a shuffled list of educational quotes"""
         quotes = self.educational_quotes.copy()
@@ -115,46 +165,30 @@ class AIProcessor:
             
         return summary
 
-    def get_assistant_response(self, question: str) -> str:
+    def detect_topic(self, question: str) -> Optional[str]:
+        """Return the knowledge-base topic a question is about, if any"""
+        question_lower = question.lower()
+        for topic, pattern in self.topic_patterns.items():
+            if pattern.search(question_lower):
+                return topic
+        return None
+
+    def get_assistant_response(self, question: str, follow_up_topic: Optional[str] = None) -> str:
         """
-        Enhanced AI assistant with domain-specific responses
+        Enhanced AI assistant with domain-specific responses.
+        follow_up_topic is the topic a follow-up such as "explain that again"
+        refers to, as resolved by the caller's conversation context.
         """
         question_lower = question.lower()
-        
-        # Science responses
-        if any(word in question_lower for word in ['photosynthesis', 'plant', 'chlorophyll']):
-            return "Photosynthesis is the process by which plants convert light energy into chemical energy. Plants use chlorophyll to capture sunlight, combine carbon dioxide from the air with water from the roots, and produce glucose and oxygen. The equation is: 6CO₂ + 6H₂O + light energy → C₆H₁₂O₆ + 6O₂. This process is essential for life on Earth as it produces oxygen and forms the base of food chains."
-        
-        elif any(word in question_lower for word in ['machine learning', 'ai', 'artificial intelligence']):
-            return "Machine Learning is a subset of artificial intelligence that enables computers to learn and make decisions from data without being explicitly programmed. It works by identifying patterns in data and using these patterns to make predictions. Common types include supervised learning (learning from labeled examples), unsupervised learning (finding hidden patterns), and reinforcement learning (learning through trial and error)."
-        
-        elif any(word in question_lower for word in ['quadratic', 'equation', 'algebra']):
-            return "A quadratic equation has the form ax² + bx + c = 0. To solve it, you can use: 1) Factoring (if possible), 2) Completing the square, or 3) The quadratic formula: x = [-b ± √(b² - 4ac)] / 2a. The discriminant (b² - 4ac) tells you about the solutions: positive = two real solutions, zero = one solution, negative = no real solutions."
-        
-        elif any(word in question_lower for word in ['water cycle', 'evaporation', 'precipitation']):
-            return "The water cycle is Earth's continuous process of water movement. It includes: 1) Evaporation - water from oceans/lakes becomes vapor, 2) Condensation - vapor cools and forms clouds, 3) Precipitation - water falls as rain/snow, 4) Collection - water gathers in bodies of water, 5) Transpiration - plants release water vapor. This cycle is powered by solar energy and gravity."
-        
-        elif any(word in question_lower for word in ['relativity', 'einstein', 'space', 'time']):
-            return "Einstein's Theory of Relativity consists of two parts: Special Relativity (1905) shows that space and time are linked as spacetime, and nothing travels faster than light. General Relativity (1915) describes gravity as the curvature of spacetime caused by mass and energy. Key insights include time dilation, length contraction, and the famous equation E=mc²."
-        
-        elif any(word in question_lower for word in ['dna', 'replication', 'genetics']):
-            return "DNA replication is the process of copying DNA before cell division. Steps: 1) Helicase unwinds the double helix, 2) DNA polymerase adds complementary nucleotides (A with T, G with C), 3) The leading strand is synthesized continuously, while the lagging strand is made in fragments (Okazaki fragments), 4) Ligase joins the fragments. This ensures each new cell has identical genetic information."
-        
-        elif any(word in question_lower for word in ['programming', 'coding', 'algorithm']):
-            return "Programming fundamentals include: 1) Variables (storing data), 2) Data types (numbers, text, booleans), 3) Control structures (if/else, loops), 4) Functions (reusable code blocks), 5) Arrays/Lists (storing multiple values), 6) Object-oriented concepts (classes, objects), 7) Problem-solving approach (breaking problems into smaller parts), 8) Debugging (finding and fixing errors)."
-        
-        elif any(word in question_lower for word in ['shakespeare', 'literature', 'writing']):
-            return "Shakespeare's writing style features: 1) Iambic pentameter (rhythmic pattern), 2) Rich metaphors and imagery, 3) Wordplay and puns, 4) Soliloquies revealing inner thoughts, 5) Complex characters with psychological depth, 6) Themes of love, power, betrayal, and human nature, 7) Invented many words still used today, 8) Blank verse and rhyming couplets for different effects."
-        
-        # Math responses
-        elif any(word in question_lower for word in ['calculus', 'derivative', 'integral']):
-            return "Calculus studies continuous change through derivatives and integrals. Derivatives measure rates of change (slope of a curve), while integrals measure accumulation (area under a curve). Key concepts include limits, the fundamental theorem of calculus (connecting derivatives and integrals), and applications in physics, engineering, and economics."
-        
-        elif any(word in question_lower for word in ['geometry', 'triangle', 'circle']):
-            return "Geometry studies shapes, sizes, and spatial relationships. Key concepts include: points, lines, angles, polygons, circles, and three-dimensional shapes. Important theorems include Pythagorean theorem (a² + b² = c²), properties of similar triangles, circle theorems, and formulas for area and volume."
-        
+
+        if follow_up_topic is not None:
+            return f"Sure, here it is again: {self.assistant_topics[follow_up_topic]['response']}"
+        topic = self.detect_topic(question)
+        if topic is not None:
+            return self.assistant_topics[topic]['response']
+
         # General responses for common question patterns
-        elif question_lower.startswith(('what is', 'what are')):
+        if question_lower.startswith(('what is', 'what are')):
             return f"That's a great question about {question[8:]}! This is a complex topic that involves multiple concepts. I'd recommend breaking it down into smaller parts and exploring each component. Would you like me to help you understand a specific aspect of this topic?"
         
         elif question_lower.startswith(('how do', 'how does')):
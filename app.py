@@ -1,7 +1,19 @@
+import io
 import os
+import sys
+import uuid
 import logging
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+import threading
+import time
+from collections import OrderedDict, deque
+from flask import (Flask, Response, g, render_template, request, jsonify, session, redirect,
+                   stream_with_context, url_for)
+from werkzeug.exceptions import RequestEntityTooLarge
 from ai_processor import AIProcessor
+from codec import ActivityEvent, ChatTurn, Flashcard, decode, encode
+from conversations import ConversationStore, is_recap_request
+from decks import EXPORT_FORMATS, DeckFormatError, detect_format, iter_export, iter_import_batches
+from jobs import LOADTEST_HOLD_SECONDS, format_sse, get_executor, iter_job_events, iter_text_chunks, jobs
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -9,6 +21,8 @@ logging.basicConfig(level=logging.DEBUG)
 # Create Flask app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "smartstudy-dev-key")
+MAX_UPLOAD_BYTES = 8 * 1024 * 1024   # Largest request body, deck and text uploads included
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
 
 # Add enumerate filter to Jinja2
 @app.template_filter('enumerate')
@@ -18,6 +32,123 @@ def enumerate_filter(iterable):
 # Initialize AI processor
 ai_processor = AIProcessor()
 
+# Server-side activity log synced from the browser (kept out of the session cookie).
+# Events are held as codec-encoded ActivityEvent records.
+ACTIVITY_LOG_LIMIT = 500       # Events retained per user, the same as the browser's ring buffer
+ACTIVITY_BATCH_LIMIT = 100     # Events accepted per sync request
+MAX_ACTIVITY_USERS = 2000      # Users kept before the least recently synced is dropped
+MAX_ACTIVITY_BYTES = 16 * 1024 * 1024  # Memory held by all logs together
+activity_log = OrderedDict()
+activity_size = 0
+activity_lock = threading.Lock()
+
+# Assistant conversations, kept server-side so the cookie does not grow with them
+conversations = ConversationStore()
+
+# Imported decks are too large for the session cookie, so they live here
+FLASHCARD_VIEW_LIMIT = 200     # Cards rendered on the flashcards page
+MAX_STORED_DECKS = 1000        # Decks kept before the least recently used is dropped
+MAX_STORED_DECK_BYTES = 64 * 1024 * 1024  # Memory held by all decks together
+flashcard_decks = OrderedDict()  # client key -> (cards, approximate size in bytes)
+deck_lock = threading.Lock()
+
+def get_client_key():
+    """Stable per-session key for server-side stores.
+
+    A random id rather than the email, which sign-in does not verify, so
+    typing someone's address never reaches their stored data.
+    """
+    if 'client_id' not in session:
+        session['client_id'] = uuid.uuid4().hex
+        g.new_client = True
+    return session['client_id']
+
+def start_user_session():
+    """Give a signed-in user a fresh server-side key"""
+    session['client_id'] = uuid.uuid4().hex
+
+@app.before_request
+def assign_client_key():
+    # Every page hands out the key, so syncs only come from sessions that already hold one
+    if request.endpoint != 'static':
+        get_client_key()
+
+def record_activity(key, events):
+    """Append encoded events to a user's log, evicting the least recently synced users past the limits"""
+    global activity_size
+    with activity_lock:
+        log = activity_log.get(key)
+        if log is None:
+            log = activity_log[key] = deque()
+        else:
+            activity_log.move_to_end(key)
+        for data in events:
+            log.append(data)
+            activity_size += sys.getsizeof(data)
+            if len(log) > ACTIVITY_LOG_LIMIT:
+                activity_size -= sys.getsizeof(log.popleft())
+        while len(activity_log) > 1 and (len(activity_log) > MAX_ACTIVITY_USERS
+                                         or activity_size > MAX_ACTIVITY_BYTES):
+            _, dropped = activity_log.popitem(last=False)
+            activity_size -= sum(sys.getsizeof(data) for data in dropped)
+
+def get_deck():
+    """Current deck: an imported one if present, else the last generated set"""
+    key = get_client_key()
+    with deck_lock:
+        stored = flashcard_decks.get(key)
+        if stored is not None:
+            flashcard_decks.move_to_end(key)
+            return stored[0]
+    return [Flashcard.from_dict(card) for card in session.get('current_flashcards', [])]
+
+def deck_size(deck):
+    """Approximate memory held by a deck's cards"""
+    return sum(sys.getsizeof(card) + sys.getsizeof(card.front) + sys.getsizeof(card.back) for card in deck)
+
+def store_deck(deck):
+    """Keep an imported deck, dropping the least recently used ones past the limits"""
+    key = get_client_key()
+    size = deck_size(deck)
+    with deck_lock:
+        flashcard_decks.pop(key, None)
+        flashcard_decks[key] = (deck, size)
+        total = sum(stored_size for _, stored_size in flashcard_decks.values())
+        while len(flashcard_decks) > 1 and (len(flashcard_decks) > MAX_STORED_DECKS
+                                            or total > MAX_STORED_DECK_BYTES):
+            _, (_, dropped_size) = flashcard_decks.popitem(last=False)
+            total -= dropped_size
+
+def summarize_chat(text):
+    """Compress chat turns that have left the verbatim window"""
+    return ai_processor.summarize_text(text, length='long')
+
+def answer_message(context, message):
+    """Answer a chat message against its conversation and record the turn"""
+    if is_recap_request(message):
+        response = context.recap(summarize_chat)
+        topic = None
+    else:
+        # Follow-ups are resolved against the conversation so far
+        topic = ai_processor.detect_topic(message)
+        follow_up_topic = None if topic else context.resolve_follow_up(message)
+        response = ai_processor.get_assistant_response(message, follow_up_topic)
+        topic = topic or follow_up_topic
+
+    context.add_turn(ChatTurn(message, response), topic, summarize_chat)
+    return response
+
+def reply_to_message(message):
+    """Answer a chat message in the user's conversation"""
+    response = answer_message(conversations.get(get_client_key()), message)
+
+    # Drop the chat history older cookies still carry
+    session.pop('chat_history', None)
+
+    # Increment questions count
+    session['questions_count'] = session.get('questions_count', 0) + 1
+    return response
+
 @app.route('/')
 def index():
     """Landing page with rotating quotes"""
@@ -40,7 +171,8 @@ def dashboard():
 def assistant():
     """AI Assistant chat interface"""
     quick_questions = ai_processor.get_quick_questions()
-    chat_history = session.get('chat_history', [])
+    context = conversations.peek(get_client_key())
+    chat_history = context.turns() if context else []
     return render_template('assistant.html', 
                          quick_questions=quick_questions,
                          chat_history=chat_history)
@@ -50,22 +182,30 @@ def assistant_chat():
     """Handle chat messages"""
     message = request.form.get('message', '').strip()
     if message:
-        # Get AI response
-        response = ai_processor.get_assistant_response(message)
+        reply_to_message(message)
+
+    return redirect(url_for('assistant'))
 
-        # Update chat history
-        chat_history = session.get('chat_history', [])
-        chat_history.append({'user': message, 'assistant': response})
-        session['chat_history'] = chat_history[-10:]  # Keep last 10 messages
+@app.route('/assistant/stream', methods=['POST'])
+def assistant_stream():
+    """Answer a chat message as a server-sent event stream"""
+    message = request.form.get('message', '').strip()
+    if not message:
+        return jsonify({'error': 'No message provided'}), 400
 
-        # Increment questions count
-        session['questions_count'] = session.get('questions_count', 0) + 1
+    response = reply_to_message(message)
 
-    return redirect(url_for('assistant'))
+    def generate():
+        for chunk in iter_text_chunks(response):
+            yield format_sse({'delta': chunk})
+        yield format_sse({'response': response}, event='done')
+
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
 
 @app.route('/assistant/clear')
 def clear_chat():
     """Clear chat history"""
+    conversations.clear(get_client_key())
     session.pop('chat_history', None)
     return redirect(url_for('assistant'))
 
@@ -113,11 +253,52 @@ def summarizer():
         return jsonify({'error': 'No text provided'}), 400
     return render_template('summarizer.html')
 
+@app.route('/jobs/summarize', methods=['POST'])
+def submit_summary_job():
+    """Queue a summary on the background executor"""
+    text = request.form.get('text', '')
+    if not text.strip():
+        return jsonify({'error': 'No text provided'}), 400
+
+    job_id = jobs.submit(get_client_key(), 'summarize_text', text,
+                         length=request.form.get('length', 'medium'),
+                         style=request.form.get('style', 'general'))
+    session['summaries_count'] = session.get('summaries_count', 0) + 1
+    return jsonify({'job_id': job_id, 'status_url': url_for('job_status', job_id=job_id)}), 202
+
+@app.route('/jobs/hold', methods=['POST'])
+def submit_hold_job():
+    """Queue a job that just sleeps, so loadtest.py has a stream that stays open"""
+    if not LOADTEST_HOLD_SECONDS:
+        return jsonify({'error': 'Set SMARTSTUDY_LOADTEST_HOLD to enable hold jobs'}), 404
+    job_id = jobs.track(get_client_key(), get_executor().submit(time.sleep, LOADTEST_HOLD_SECONDS))
+    return jsonify({'job_id': job_id, 'status_url': url_for('job_status', job_id=job_id)}), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Poll a background job"""
+    status = jobs.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """The job's status as one server-sent event; the browser reconnects until it is done"""
+    return Response(stream_with_context(iter_job_events(job_id)),
+                    mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/events')
+def user_events():
+    """Server-sent events for the user's background jobs (ASGI only)"""
+    # An endless stream would pin a sync worker until gunicorn kills it
+    return jsonify({'error': 'Event streams need the ASGI server: uvicorn asgi:app'}), 501
+
 @app.route('/flashcards')
 def flashcards():
     """Flashcard creator and viewer"""
-    flashcard_set = session.get('current_flashcards', [])
-    return render_template('flashcards.html', flashcards=flashcard_set)
+    deck = get_deck()
+    return render_template('flashcards.html', flashcards=deck[:FLASHCARD_VIEW_LIMIT], total_cards=len(deck))
 
 @app.route('/flashcards/generate', methods=['POST'])
 def generate_flashcards():
@@ -128,6 +309,8 @@ def generate_flashcards():
     if text:
         flashcards = ai_processor.generate_flashcards(text, card_count)
         session['current_flashcards'] = flashcards
+        with deck_lock:
+            flashcard_decks.pop(get_client_key(), None)
         session['flashcards_count'] = session.get('flashcards_count', 0) + len(flashcards)
 
         # Save to history
@@ -143,6 +326,47 @@ def generate_flashcards():
         return render_template('flashcards.html', flashcards=flashcards)
     return render_template('flashcards.html', error="Please enter text to generate flashcards")
 
+@app.route('/flashcards/export')
+def export_flashcards():
+    """Stream the current deck as CSV or an Anki import file"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    chunks = iter_export(get_deck(), fmt)
+    return Response(stream_with_context(chunks),
+                    mimetype=f'{mimetype}; charset=utf-8',
+                    headers={'Content-Disposition': f'attachment; filename=smartstudy-deck.{extension}'})
+
+@app.route('/flashcards/import', methods=['POST'])
+def import_flashcards():
+    """Import a CSV or Anki text deck, replacing the current deck"""
+    try:
+        file = request.files.get('file')
+    except RequestEntityTooLarge:
+        error = f"Deck files are limited to {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+        return render_template('flashcards.html', error=error), 413
+    if not file or not file.filename:
+        return render_template('flashcards.html', error="Please choose a deck file to import")
+
+    fmt = detect_format(file.filename, request.form.get('format', ''))
+    stream = io.TextIOWrapper(file.stream, encoding='utf-8-sig', newline='')
+    deck = []
+    try:
+        for batch in iter_import_batches(stream, fmt):
+            deck.extend(batch)
+    except DeckFormatError as e:
+        return render_template('flashcards.html', error=str(e))
+
+    if not deck:
+        return render_template('flashcards.html', error="No cards found in the uploaded deck")
+
+    store_deck(deck)
+    session.pop('current_flashcards', None)
+
+    return redirect(url_for('flashcards'))
+
 @app.route('/quiz')
 def quiz():
     """Interactive quiz page"""
@@ -210,10 +434,12 @@ def progress():
 @app.route('/history')
 def history():
     """Activity history page"""
+    context = conversations.peek(get_client_key())
     history_data = {
         'summaries': session.get('summary_history', []),
         'flashcards': session.get('flashcard_history', []),
-        'chats': session.get('chat_history', [])
+        'chats': context.turns() if context else [],
+        'chat_summary': context.earlier_summary(summarize_chat) if context else ''
     }
     return render_template('history.html', history=history_data)
 
@@ -226,15 +452,51 @@ def clear_history():
         session.pop('summary_history', None)
         session.pop('flashcard_history', None)
         session.pop('chat_history', None)
+        conversations.clear(get_client_key())
     elif activity_type == 'summaries':
         session.pop('summary_history', None)
     elif activity_type == 'flashcards':
         session.pop('flashcard_history', None)
     elif activity_type == 'chats':
         session.pop('chat_history', None)
+        conversations.clear(get_client_key())
 
     return redirect(url_for('history'))
 
+@app.route('/activity')
+def activity():
+    """Return the synced activity log, newest first"""
+    limit = request.args.get('limit', 50, type=int)
+    with activity_lock:
+        stored = list(activity_log.get(get_client_key(), ()))
+    stored.reverse()
+    events = [decode(data).to_dict() for data in stored[:max(0, limit)]]
+    return jsonify({'events': events})
+
+@app.route('/activity/sync', methods=['POST'])
+def sync_activity():
+    """Accept a batch of client activity events"""
+    if g.get('new_client'):
+        # Sessions without a key yet (or cookie-less clients) would each claim a new log
+        return jsonify({'error': 'No session yet; retry with the session cookie'}), 409
+
+    data = request.get_json(silent=True, force=True)
+    events = data.get('events') if isinstance(data, dict) else None
+    if not isinstance(events, list):
+        return jsonify({'error': 'Expected a list of events'}), 400
+
+    accepted = [
+        encode(ActivityEvent(
+            str(event.get('type', ''))[:50],
+            str(event.get('details', ''))[:200],
+            str(event.get('timestamp', ''))[:40]
+        ))
+        for event in events[:ACTIVITY_BATCH_LIMIT]
+        if isinstance(event, dict)
+    ]
+    record_activity(get_client_key(), accepted)
+    return jsonify({'accepted': len(accepted)})
+
 @app.route('/about')
 def about():
     """Meet the developer page"""
@@ -253,6 +515,7 @@ def signin():
             session['user_email'] = email
             session['user_name'] = email.split('@')[0].title()
             session['is_authenticated'] = True
+            start_user_session()
 
             if remember:
                 session.permanent = True
@@ -287,6 +550,7 @@ def signup():
         session['user_email'] = email
         session['user_name'] = name
         session['is_authenticated'] = True
+        start_user_session()
 
         return redirect(url_for('dashboard'))
 
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+from itsdangerous import BadSignature
+from werkzeug.http import dump_cookie, parse_cookie
+
+from app import answer_message, app as flask_app, conversations
+from jobs import (SSE_HEARTBEAT, SSE_POLL_INTERVAL, format_sse, get_executor, iter_text_chunks,
+                  job_event, jobs, new_finished_jobs)
+
+# Optional ASGI entry point, run with `uvicorn asgi:app`.
+#
+# Long-lived and I/O-bound endpoints (assistant streaming, job status and the
+# server-sent event streams) are served on the event loop, so an open stream
+# costs a coroutine instead of a worker. Background jobs run on the executor
+# in jobs.py and chat answers on a thread. Every other route is passed
+# through to the Flask app, which asgiref runs on a thread pool.
+
+MAX_BODY_SIZE = 1024 * 1024
+Headers = List[Tuple[bytes, bytes]]
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+
+class CookieSession:
+    """The Flask session cookie, read and written outside a Flask request"""
+
+    def __init__(self, scope: Dict[str, Any]):
+        self.interface = flask_app.session_interface
+        self.serializer = self.interface.get_signing_serializer(flask_app)
+        self.name = flask_app.config['SESSION_COOKIE_NAME']
+        self.data: Dict[str, Any] = {}
+        self.modified = False
+
+        cookie = parse_cookie(_header(scope, b'cookie')).get(self.name)
+        if cookie and self.serializer is not None:
+            max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+            try:
+                self.data = self.serializer.loads(cookie, max_age=max_age)
+            except (BadSignature, ValueError):
+                self.data = {}
+
+    def client_key(self) -> str:
+        """Same key as app.get_client_key"""
+        if 'client_id' not in self.data:
+            self.data['client_id'] = uuid.uuid4().hex
+            self.modified = True
+        return self.data['client_id']
+
+    def headers(self) -> Headers:
+        if not self.modified or self.serializer is None:
+            return []
+        expires = None
+        if self.data.get('_permanent'):
+            expires = datetime.now(timezone.utc) + flask_app.permanent_session_lifetime
+        cookie = dump_cookie(
+            self.name,
+            self.serializer.dumps(self.data),
+            expires=expires,
+            domain=self.interface.get_cookie_domain(flask_app),
+            path=self.interface.get_cookie_path(flask_app),
+            secure=self.interface.get_cookie_secure(flask_app),
+            httponly=self.interface.get_cookie_httponly(flask_app),
+            samesite=self.interface.get_cookie_samesite(flask_app),
+        )
+        return [(b'set-cookie', cookie.encode('latin-1')), (b'vary', b'Cookie')]
+
+
+def _header(scope: Dict[str, Any], name: bytes) -> str:
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+
+async def read_form(scope: Dict[str, Any], receive) -> Dict[str, str]:
+    """Read a form-encoded or JSON request body"""
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if len(body) > MAX_BODY_SIZE:
+            raise ValueError('Request body too large')
+
+    if _header(scope, b'content-type').startswith('application/json'):
+        data = json.loads(body or b'{}')
+        return {key: str(value) for key, value in data.items()} if isinstance(data, dict) else {}
+    return {key: values[0] for key, values in parse_qs(body.decode('utf-8')).items()}
+
+
+async def send_json(send, status: int, data: Any, headers: Optional[Headers] = None) -> None:
+    body = json.dumps(data).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode())] + (headers or []),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def start_event_stream(send, headers: Optional[Headers] = None) -> None:
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache')] + (headers or []),
+    })
+
+
+async def send_event(send, event: str, more_body: bool = True) -> None:
+    await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': more_body})
+
+
+def watch_disconnect(receive) -> Tuple[asyncio.Event, asyncio.Task]:
+    """Event set once the client goes away, and the task watching for it.
+
+    The caller cancels the task when its stream ends.
+    """
+    disconnected = asyncio.Event()
+
+    async def watch():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    return disconnected, asyncio.get_running_loop().create_task(watch())
+
+
+async def wait_or_disconnect(disconnected: asyncio.Event, timeout: float) -> bool:
+    """Sleep up to timeout; True if the client disconnected meanwhile"""
+    try:
+        await asyncio.wait_for(disconnected.wait(), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+async def assistant_stream(scope, receive, send) -> None:
+    """Async counterpart of app.assistant_stream"""
+    try:
+        form = await read_form(scope, receive)
+    except ValueError as e:
+        return await send_json(send, 400, {'error': str(e)})
+    message = form.get('message', '').strip()
+    if not message:
+        return await send_json(send, 400, {'error': 'No message provided'})
+
+    session = CookieSession(scope)
+    context = conversations.get(session.client_key())
+
+    # The conversation lives in this process, so the answer is computed on a thread rather than the executor
+    response = await asyncio.to_thread(answer_message, context, message)
+
+    session.data.pop('chat_history', None)
+    session.data['questions_count'] = session.data.get('questions_count', 0) + 1
+    session.modified = True
+
+    await start_event_stream(send, session.headers())
+    for chunk in iter_text_chunks(response):
+        await send_event(send, format_sse({'delta': chunk}))
+    await send_event(send, format_sse({'response': response}, event='done'), more_body=False)
+
+
+async def job_status(scope, receive, send, job_id: str) -> None:
+    status = jobs.status(job_id)
+    if status is None:
+        return await send_json(send, 404, {'error': 'Unknown job'})
+    await send_json(send, 200, status)
+
+
+async def job_events(scope, receive, send, job_id: str) -> None:
+    """Async counterpart of app.job_events"""
+    disconnected, watcher = watch_disconnect(receive)
+    try:
+        await start_event_stream(send)
+        idle = 0.0
+        while True:
+            event = job_event(job_id)
+            if event is not None:
+                return await send_event(send, event, more_body=False)
+            if await wait_or_disconnect(disconnected, SSE_POLL_INTERVAL):
+                return
+            idle += SSE_POLL_INTERVAL
+            if idle >= SSE_HEARTBEAT:
+                await send_event(send, ': keep-alive\n\n')
+                idle = 0.0
+    finally:
+        watcher.cancel()
+
+
+async def user_events(scope, receive, send) -> None:
+    """Async counterpart of app.user_events"""
+    session = CookieSession(scope)
+    owner = session.client_key()
+    disconnected, watcher = watch_disconnect(receive)
+    announced = jobs.finished_for(owner)
+    try:
+        await start_event_stream(send, session.headers())
+        await send_event(send, ': connected\n\n')
+        idle = 0.0
+        while not await wait_or_disconnect(disconnected, SSE_POLL_INTERVAL):
+            idle += SSE_POLL_INTERVAL
+            for event in new_finished_jobs(owner, announced):
+                await send_event(send, event)
+                idle = 0.0
+            if idle >= SSE_HEARTBEAT:
+                await send_event(send, ': keep-alive\n\n')
+                idle = 0.0
+    finally:
+        watcher.cancel()
+
+
+async def lifespan(scope, receive, send) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            get_executor().shutdown(wait=False, cancel_futures=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send) -> None:
+    if scope['type'] == 'lifespan':
+        return await lifespan(scope, receive, send)
+
+    if scope['type'] == 'http':
+        path, method = scope['path'], scope['method']
+        if path == '/assistant/stream' and method == 'POST':
+            return await assistant_stream(scope, receive, send)
+        if path == '/events' and method == 'GET':
+            return await user_events(scope, receive, send)
+        if path.startswith('/jobs/') and method == 'GET':
+            parts = path[len('/jobs/'):].split('/')
+            if len(parts) == 1 and parts[0]:
+                return await job_status(scope, receive, send, parts[0])
+            if len(parts) == 2 and parts[0] and parts[1] == 'events':
+                return await job_events(scope, receive, send, parts[0])
+
+    await wsgi_app(scope, receive, send)
@@ -0,0 +1,325 @@
+import struct
+from typing import Any, Dict, List, Optional
+
+# Compact binary codec for server-side history and cache payloads.
+#
+# The wire format follows MessagePack for scalars, strings, arrays and maps,
+# with two additions that remove the repeated key names JSON carries around:
+#   0xc1 <tag>          a map key taken from FIELD_NAMES (one byte instead of the key)
+#   0xc7 <kind> <n>     a record: its registered kind followed by its n fields in slot order
+# Both tables are append-only; reordering them breaks payloads already stored.
+
+MAGIC = b'SS\x01'
+
+FIELD_NAMES = (
+    # Record and history fields
+    'front', 'back', 'question', 'options', 'correct', 'explanation', 'timestamp',
+    'text', 'summary', 'count', 'user', 'assistant', 'topic', 'difficulty',
+    'questions', 'score', 'total', 'percentage', 'answers', 'user_answer',
+    'correct_answer', 'is_correct', 'type', 'details',
+    # Session keys
+    'summaries_count', 'flashcards_count', 'quizzes_count', 'questions_count',
+    'chat_history', 'summary_history', 'flashcard_history', 'current_flashcards',
+    'current_quiz', 'quiz_answers', 'quiz_results', 'user_email', 'user_name',
+    'is_authenticated', 'client_id', '_permanent',
+)
+FIELD_TAGS = {name: tag for tag, name in enumerate(FIELD_NAMES)}
+
+
+class Record:
+    """Base class for typed, slot-based payload records"""
+    __slots__ = ()
+    kind = None
+
+    def __init__(self, *args, **kwargs):
+        values = dict(zip(self.__slots__, args))
+        values.update(kwargs)
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Record':
+        return cls(**{name: data.get(name) for name in cls.__slots__})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __getitem__(self, name: str) -> Any:
+        # Lets code written against the old dict payloads keep working
+        if name not in self.__slots__:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return getattr(self, name) if name in self.__slots__ else default
+
+    def __eq__(self, other: Any) -> bool:
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+class Flashcard(Record):
+    __slots__ = ('front', 'back')
+    kind = 0
+
+
+class ChatTurn(Record):
+    __slots__ = ('user', 'assistant')
+    kind = 4
+
+
+class ActivityEvent(Record):
+    __slots__ = ('type', 'details', 'timestamp')
+    kind = 7
+
+
+# Kinds 1-3, 5 and 6 belonged to the quiz and history records that lived in the
+# session cookie; they stay reserved so old payloads fail loudly instead of misdecoding
+RECORD_TYPES = {cls.kind: cls for cls in (Flashcard, ChatTurn, ActivityEvent)}
+
+
+class CodecError(ValueError):
+    """Raised when a payload cannot be encoded or decoded"""
+
+
+_pack_int64 = struct.Struct('>q').pack
+_pack_float = struct.Struct('>d').pack
+_pack_u16 = struct.Struct('>H').pack
+_pack_u32 = struct.Struct('>I').pack
+_unpack_int64 = struct.Struct('>q').unpack_from
+_unpack_float = struct.Struct('>d').unpack_from
+_unpack_u16 = struct.Struct('>H').unpack_from
+_unpack_u32 = struct.Struct('>I').unpack_from
+
+
+def _write_header(out: bytearray, size: int, fix_base: int, fix_limit: int, code8: Optional[int],
+                  code16: int, code32: int) -> None:
+    if size < fix_limit:
+        out.append(fix_base | size)
+    elif code8 is not None and size < 0x100:
+        out.append(code8)
+        out.append(size)
+    elif size < 0x10000:
+        out.append(code16)
+        out += _pack_u16(size)
+    else:
+        out.append(code32)
+        out += _pack_u32(size)
+
+
+def _encode_str(out: bytearray, value: str) -> None:
+    data = value.encode('utf-8')
+    _write_header(out, len(data), 0xa0, 32, 0xd9, 0xda, 0xdb)
+    out += data
+
+
+def _encode(out: bytearray, value: Any) -> None:
+    # Ordered by how often each type shows up in session payloads
+    value_type = type(value)
+    if value_type is str:
+        _encode_str(out, value)
+    elif value_type is int:
+        if 0 <= value < 0x80:
+            out.append(value)
+        elif -32 <= value < 0:
+            out.append(value & 0xff)
+        elif -(1 << 63) <= value < (1 << 63):
+            out.append(0xd3)
+            out += _pack_int64(value)
+        else:
+            raise CodecError(f'Integer out of range: {value}')
+    elif isinstance(value, Record):
+        out.append(0xc7)
+        out.append(value.kind)
+        out.append(len(value.__slots__))
+        for name in value.__slots__:
+            _encode(out, getattr(value, name))
+    elif value_type is list or value_type is tuple:
+        _write_header(out, len(value), 0x90, 16, None, 0xdc, 0xdd)
+        for item in value:
+            _encode(out, item)
+    elif isinstance(value, dict):
+        _write_header(out, len(value), 0x80, 16, None, 0xde, 0xdf)
+        for key, item in value.items():
+            tag = FIELD_TAGS.get(key) if type(key) is str else None
+            if tag is not None:
+                out.append(0xc1)
+                out.append(tag)
+            else:
+                _encode(out, key)
+            _encode(out, item)
+    elif value is None:
+        out.append(0xc0)
+    elif value is True:
+        out.append(0xc3)
+    elif value is False:
+        out.append(0xc2)
+    elif value_type is float:
+        out.append(0xcb)
+        out += _pack_float(value)
+    elif value_type is bytes:
+        _write_header(out, len(value), 0, 0, 0xc4, 0xc5, 0xc6)
+        out += value
+    else:
+        raise CodecError(f'Cannot encode {value_type.__name__}')
+
+
+def _decode(data: bytes, pos: int):
+    code = data[pos]
+    pos += 1
+    if code < 0x80:
+        return code, pos
+    if code >= 0xe0:
+        return code - 0x100, pos
+    if 0xa0 <= code <= 0xbf:
+        end = pos + (code & 0x1f)
+        return data[pos:end].decode('utf-8'), end
+    if 0x90 <= code <= 0x9f:
+        return _decode_array(data, pos, code & 0x0f)
+    if 0x80 <= code <= 0x8f:
+        return _decode_map(data, pos, code & 0x0f)
+    if code == 0xc7:
+        kind, count = data[pos], data[pos + 1]
+        pos += 2
+        cls = RECORD_TYPES.get(kind)
+        if cls is None:
+            raise CodecError(f'Unknown record kind {kind}')
+        values, pos = _decode_array(data, pos, count)
+        return cls(*values), pos
+    if code == 0xc0:
+        return None, pos
+    if code == 0xc2:
+        return False, pos
+    if code == 0xc3:
+        return True, pos
+    if code == 0xd3:
+        return _unpack_int64(data, pos)[0], pos + 8
+    if code == 0xcb:
+        return _unpack_float(data, pos)[0], pos + 8
+    if code in (0xd9, 0xda, 0xdb, 0xc4, 0xc5, 0xc6):
+        if code in (0xd9, 0xc4):
+            size, pos = data[pos], pos + 1
+        elif code in (0xda, 0xc5):
+            size, pos = _unpack_u16(data, pos)[0], pos + 2
+        else:
+            size, pos = _unpack_u32(data, pos)[0], pos + 4
+        chunk = data[pos:pos + size]
+        return (chunk.decode('utf-8') if code in (0xd9, 0xda, 0xdb) else bytes(chunk)), pos + size
+    if code == 0xdc:
+        return _decode_array(data, pos + 2, _unpack_u16(data, pos)[0])
+    if code == 0xdd:
+        return _decode_array(data, pos + 4, _unpack_u32(data, pos)[0])
+    if code == 0xde:
+        return _decode_map(data, pos + 2, _unpack_u16(data, pos)[0])
+    if code == 0xdf:
+        return _decode_map(data, pos + 4, _unpack_u32(data, pos)[0])
+    raise CodecError(f'Unknown type code 0x{code:02x}')
+
+
+def _decode_array(data: bytes, pos: int, count: int):
+    items = []
+    for _ in range(count):
+        item, pos = _decode(data, pos)
+        items.append(item)
+    return items, pos
+
+
+def _decode_map(data: bytes, pos: int, count: int):
+    result = {}
+    for _ in range(count):
+        if data[pos] == 0xc1:
+            key, pos = FIELD_NAMES[data[pos + 1]], pos + 2
+        else:
+            key, pos = _decode(data, pos)
+        result[key], pos = _decode(data, pos)
+    return result, pos
+
+
+def encode(value: Any) -> bytes:
+    """Encode a value (records, dicts, lists and scalars) to compact bytes"""
+    out = bytearray(MAGIC)
+    _encode(out, value)
+    return bytes(out)
+
+
+def decode(data: bytes) -> Any:
+    """Decode bytes produced by encode()"""
+    if not data.startswith(MAGIC):
+        raise CodecError('Not a SmartStudy payload')
+    try:
+        value, pos = _decode(data, len(MAGIC))
+    except (IndexError, UnicodeDecodeError, struct.error) as e:
+        raise CodecError(f'Truncated or corrupt payload: {e}') from e
+    if pos > len(data):
+        raise CodecError('Truncated payload')
+    if pos != len(data):
+        raise CodecError('Trailing data after payload')
+    return value
+
+
+def _sample_session(entries: int = 20) -> Dict[str, Any]:
+    """Representative session payload for the benchmark"""
+    from ai_processor import AIProcessor
+    processor = AIProcessor()
+    text = ("Photosynthesis is the process by which plants convert light energy into chemical energy. "
+            "The process takes place in the chloroplasts of plant cells. ") * 5
+    return {
+        'current_flashcards': [Flashcard.from_dict(card) for card in processor.generate_flashcards(text, 8)],
+        'current_quiz': processor.generate_quiz('science', 'medium'),
+        'chat_history': [ChatTurn(q, processor.get_assistant_response(q))
+                         for q in processor.get_quick_questions()[:10]],
+        'summary_history': [{'text': text[:100] + '...', 'summary': text[:200] + '...',
+                             'timestamp': '2025-08-01 12:00:00'} for _ in range(entries)],
+        'flashcard_history': [{'text': text[:100] + '...', 'count': 8,
+                               'timestamp': '2025-08-01 12:00:00'} for _ in range(entries)],
+        'summaries_count': entries,
+        'flashcards_count': entries * 8,
+    }
+
+
+def _plain(value: Any) -> Any:
+    """Convert records to the dicts the JSON session serializer stores"""
+    if isinstance(value, Record):
+        return {name: _plain(getattr(value, name)) for name in value.__slots__}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    return value
+
+
+def benchmark(rounds: int = 2000) -> List[str]:
+    """Compare size and speed of the codec against the JSON payloads"""
+    import json
+    import timeit
+    import zlib
+
+    session_data = _sample_session()
+    plain = _plain(session_data)
+    json_bytes = json.dumps(plain, separators=(',', ':')).encode('utf-8')
+    binary = encode(session_data)
+    assert decode(binary) == session_data
+
+    lines = [
+        f"{'':12}{'raw bytes':>12}{'zlib bytes':>12}{'encode us':>12}{'decode us':>12}",
+    ]
+    for name, size, packed, enc, dec in (
+        ('json', len(json_bytes), len(zlib.compress(json_bytes)),
+         lambda: json.dumps(plain, separators=(',', ':')).encode('utf-8'),
+         lambda: json.loads(json_bytes)),
+        ('codec', len(binary), len(zlib.compress(binary)),
+         lambda: encode(session_data),
+         lambda: decode(binary)),
+    ):
+        enc_us = timeit.timeit(enc, number=rounds) / rounds * 1e6
+        dec_us = timeit.timeit(dec, number=rounds) / rounds * 1e6
+        lines.append(f'{name:12}{size:>12}{packed:>12}{enc_us:>12.1f}{dec_us:>12.1f}')
+    return lines
+
+
+if __name__ == '__main__':
+    print('\n'.join(benchmark()))
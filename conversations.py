@@ -0,0 +1,167 @@
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+from codec import ChatTurn
+
+# Per-conversation memory for the AI assistant.
+#
+# The newest turns are kept verbatim. Older ones wait in a bounded list and
+# are folded into a short extractive summary when something reads it (a recap
+# request or the history page) or when the list fills up, so chatting pays
+# for one summary every MAX_PENDING_TURNS turns at most and no turn is lost.
+# Topics are indexed by recency so a follow-up such as "explain that again"
+# or "go back to the previous one" resolves with a dict lookup instead of a
+# scan over the transcript.
+
+RECENT_TURNS = 10              # Turns kept verbatim
+MAX_PENDING_TURNS = 40         # Older turns kept for the next summary; a full list is summarized right away
+MAX_SUMMARY_CHARS = 1000       # Upper bound on the compressed history
+MAX_TOPICS = 16                # Distinct topics remembered per conversation
+MAX_CONVERSATIONS = 10000      # Conversations kept in memory before the oldest is dropped
+SHORT_FOLLOW_UP_WORDS = 4      # "and that?", "why is it" -- short enough to need the context
+
+# Phrases that only make sense as a follow-up, whatever the message length
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(?:again|repeat|tell me more|more about (?:that|it|this)|elaborate|simpler|"
+    r"(?:an|another) example|go back|before that|previous (?:one|topic)|earlier (?:one|topic)|last (?:one|topic))\b"
+)
+EARLIER_TOPIC_PATTERN = re.compile(r"\b(?:go back|previous|earlier|before that)\b")
+REFERRING_WORDS = frozenset({'that', 'it', 'this'})
+# Messages starting like this are questions in their own right, even when short
+QUESTION_PREFIXES = ('what is', 'what are', "what's", 'how do', 'how does')
+RECAP_PATTERN = re.compile(
+    r"\b(?:summari[sz]e (?:our|this|the) (?:conversation|chat)|"
+    r"what (?:did|have) we (?:talk(?:ed)? about|discuss(?:ed)?|cover(?:ed)?))\b"
+)
+
+
+def is_follow_up(message: str) -> bool:
+    """True if a message refers back to the conversation rather than asking afresh"""
+    text = message.lower()
+    if FOLLOW_UP_PATTERN.search(text):
+        return True
+    if text.startswith(QUESTION_PREFIXES):
+        return False
+    words = re.findall(r"[a-z']+", text)
+    return len(words) <= SHORT_FOLLOW_UP_WORDS and not REFERRING_WORDS.isdisjoint(words)
+
+
+def is_recap_request(message: str) -> bool:
+    """True if the user asks what the conversation has covered"""
+    return RECAP_PATTERN.search(message.lower()) is not None
+
+
+class ConversationContext:
+    """Bounded memory of one assistant conversation"""
+    __slots__ = ('recent', 'pending', 'summary', 'topics', 'turn_count', 'lock')
+
+    def __init__(self):
+        self.recent = deque(maxlen=RECENT_TURNS)
+        # Turns that left the verbatim window and are not yet in the summary
+        self.pending = deque()
+        self.summary = ''
+        # topic -> turn number it was last discussed, oldest first
+        self.topics = OrderedDict()
+        self.turn_count = 0
+        self.lock = threading.Lock()
+
+    def add_turn(self, turn: ChatTurn, topic: Optional[str], summarize: Callable[[str], str]) -> None:
+        """Record a turn; whatever falls out of the verbatim window waits for the summary"""
+        with self.lock:
+            if len(self.recent) == self.recent.maxlen:
+                self.pending.append(self.recent[0])
+                if len(self.pending) >= MAX_PENDING_TURNS:
+                    self._fold_pending(summarize)
+            self.recent.append(turn)
+            self.turn_count += 1
+
+            if topic is not None:
+                self.topics.pop(topic, None)
+                self.topics[topic] = self.turn_count
+                if len(self.topics) > MAX_TOPICS:
+                    self.topics.popitem(last=False)
+
+    def earlier_summary(self, summarize: Callable[[str], str]) -> str:
+        """Summary of the turns before the verbatim window, brought up to date on read"""
+        with self.lock:
+            if self.pending:
+                self._fold_pending(summarize)
+            return self.summary
+
+    def _fold_pending(self, summarize: Callable[[str], str]) -> None:
+        # Caller holds the lock
+        text = ' '.join([self.summary] + [
+            f"{turn.user.rstrip('.?!')}. {turn.assistant}" for turn in self.pending
+        ]).strip()
+        summary = summarize(text)
+        if len(summary) > MAX_SUMMARY_CHARS:
+            # Keep the most recent sentences that fit
+            summary = summary[-MAX_SUMMARY_CHARS:]
+            summary = summary[summary.find('. ') + 2:] if '. ' in summary else summary
+        self.summary = summary
+        self.pending.clear()
+
+    def recap(self, summarize: Callable[[str], str]) -> str:
+        """Reply to a request to recap the conversation"""
+        earlier = self.earlier_summary(summarize)
+        with self.lock:
+            topics = list(reversed(self.topics))
+            last_question = self.recent[-1].user if self.recent else None
+        if last_question is None:
+            return "We haven't talked about anything yet. Ask me a question to get started!"
+
+        parts = []
+        if topics:
+            parts.append(f"So far we've covered: {', '.join(topics)}.")
+        if earlier:
+            parts.append(f"Earlier in our conversation: {earlier}")
+        parts.append(f'Most recently you asked: "{last_question}"')
+        return ' '.join(parts)
+
+    def resolve_follow_up(self, message: str) -> Optional[str]:
+        """Topic a follow-up message refers to, or None if it is not a follow-up"""
+        if not is_follow_up(message):
+            return None
+        with self.lock:
+            if not self.topics:
+                return None
+            topics = reversed(self.topics)
+            current = next(topics)
+            if EARLIER_TOPIC_PATTERN.search(message.lower()):
+                # The topic discussed before the current one
+                return next(topics, current)
+            return current
+
+    def turns(self) -> List[ChatTurn]:
+        with self.lock:
+            return list(self.recent)
+
+
+class ConversationStore:
+    """Server-side conversations keyed by client, evicting the least recently used"""
+
+    def __init__(self, max_conversations: int = MAX_CONVERSATIONS):
+        self.max_conversations = max_conversations
+        self.conversations: Dict[str, ConversationContext] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> ConversationContext:
+        with self.lock:
+            context = self.conversations.get(key)
+            if context is None:
+                context = self.conversations[key] = ConversationContext()
+                if len(self.conversations) > self.max_conversations:
+                    self.conversations.popitem(last=False)
+            else:
+                self.conversations.move_to_end(key)
+            return context
+
+    def peek(self, key: str) -> Optional[ConversationContext]:
+        with self.lock:
+            return self.conversations.get(key)
+
+    def clear(self, key: str) -> None:
+        with self.lock:
+            self.conversations.pop(key, None)
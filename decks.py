@@ -0,0 +1,152 @@
+import csv
+import io
+import re
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, TextIO
+
+from codec import Flashcard
+
+# Deck export/import in CSV and Anki's plain-text note format.
+#
+# Anki imports tab-separated text directly (File > Import) and reads the
+# '#key:value' header lines to pick the separator and field mapping, so the
+# 'anki' format is that text file rather than a SQLite-backed .apkg, which
+# cannot be produced as a stream.
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'anki': ('text/tab-separated-values', 'txt'),
+}
+EXPORT_CHUNK_ROWS = 2000       # Rows written per streamed chunk
+IMPORT_BATCH_SIZE = 2000       # Cards handed to the store per batch
+MAX_IMPORT_CARDS = 200000
+
+ANKI_HEADER = '#separator:tab\n#html:false\n#columns:Front\tBack\n'
+ANKI_SEPARATORS = {'tab': '\t', 'comma': ',', 'semicolon': ';', 'pipe': '|', 'space': ' '}
+# Header lines Anki understands; any other line, even one starting with '#', is a card
+ANKI_HEADER_LINE = re.compile(
+    r'#(separator|html|tags|columns|notetype|deck|notetype column|deck column|tags column|'
+    r'guid column|if matches):', re.IGNORECASE)
+
+
+class DeckFormatError(ValueError):
+    """Raised when an uploaded deck cannot be parsed"""
+
+
+def iter_export(cards: Iterable[Flashcard], fmt: str) -> Iterator[str]:
+    """Yield a deck as text chunks of at most EXPORT_CHUNK_ROWS rows"""
+    if fmt not in EXPORT_FORMATS:
+        raise DeckFormatError(f'Unsupported format: {fmt}')
+
+    buffer = io.StringIO()
+    delimiter = '\t' if fmt == 'anki' else ','
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator='\n')
+    # A front starting with '#' is quoted so it cannot be read back as a header line
+    quoted_writer = csv.writer(buffer, delimiter=delimiter, lineterminator='\n', quoting=csv.QUOTE_ALL)
+    if fmt == 'anki':
+        buffer.write(ANKI_HEADER)
+    else:
+        writer.writerow(('front', 'back'))
+
+    cards = iter(cards)
+    while True:
+        chunk = list(islice(cards, EXPORT_CHUNK_ROWS))
+        if not chunk:
+            break
+        rows = [(card.front, card.back) for card in chunk]
+        if any(front.startswith('#') for front, _ in rows):
+            for row in rows:
+                (quoted_writer if row[0].startswith('#') else writer).writerow(row)
+        else:
+            writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Header of an empty deck
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _anki_reader(stream: TextIO) -> Iterator[List[str]]:
+    """Skip Anki's header lines, honouring a declared separator"""
+    delimiter = '\t'
+    first_line = ''
+    for line in stream:
+        header = ANKI_HEADER_LINE.match(line)
+        if header is None:
+            first_line = line
+            break
+        key, value = header.group(1).lower(), line[header.end():]
+        if key == 'separator':
+            value = value.strip()
+            delimiter = ANKI_SEPARATORS.get(value.lower(), value[:1] or '\t')
+    return csv.reader(chain([first_line], stream), delimiter=delimiter)
+
+
+def _csv_reader(stream: TextIO) -> Iterator[List[str]]:
+    """CSV rows, dropping a leading front,back header"""
+    rows = csv.reader(stream)
+    header = next(rows, None)
+    if header and [field.strip().lower() for field in header[:2]] != ['front', 'back']:
+        rows = chain([header], rows)
+    return rows
+
+
+def iter_import_batches(stream: TextIO, fmt: str) -> Iterator[List[Flashcard]]:
+    """Parse a deck incrementally, yielding lists of up to IMPORT_BATCH_SIZE cards"""
+    if fmt not in EXPORT_FORMATS:
+        raise DeckFormatError(f'Unsupported format: {fmt}')
+
+    total = 0
+    batch = []
+    try:
+        # Header lines are read here too, so a bad encoding or oversized field fails cleanly
+        rows = _anki_reader(stream) if fmt == 'anki' else _csv_reader(stream)
+        for row in rows:
+            if len(row) < 2 or not row[0]:
+                continue
+            batch.append(Flashcard(row[0], row[1]))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                total += len(batch)
+                if total > MAX_IMPORT_CARDS:
+                    raise DeckFormatError(f'Decks are limited to {MAX_IMPORT_CARDS} cards')
+                yield batch
+                batch = []
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise DeckFormatError(f'Unable to read deck: {e}') from e
+
+    if batch:
+        if total + len(batch) > MAX_IMPORT_CARDS:
+            raise DeckFormatError(f'Decks are limited to {MAX_IMPORT_CARDS} cards')
+        yield batch
+
+
+def detect_format(filename: str, requested: str = '') -> str:
+    """Pick an import format from the form field or the file extension"""
+    if requested in EXPORT_FORMATS:
+        return requested
+    return 'csv' if filename.lower().endswith('.csv') else 'anki'
+
+
+def benchmark(cards: int = 100000) -> List[str]:
+    """Measure export and import throughput in cards per second"""
+    import time
+
+    deck = [Flashcard(f'Question {i}, with "quotes"', f'Answer {i}\twith a tab') for i in range(cards)]
+    lines = []
+    for fmt in EXPORT_FORMATS:
+        start = time.perf_counter()
+        text = ''.join(iter_export(deck, fmt))
+        export_rate = cards / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        imported = sum(len(batch) for batch in iter_import_batches(io.StringIO(text, newline=''), fmt))
+        import_rate = cards / (time.perf_counter() - start)
+        assert imported == cards
+        lines.append(f'{fmt:6} export {export_rate:>12,.0f} cards/s   import {import_rate:>12,.0f} cards/s')
+    return lines
+
+
+if __name__ == '__main__':
+    print('\n'.join(benchmark()))
@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+# Background jobs for CPU-bound AIProcessor work.
+#
+# Work runs on a shared executor: threads by default, or worker processes
+# when SMARTSTUDY_EXECUTOR=process so long summaries do not hold the GIL
+# for the serving threads or event loop. Both the Flask app and the ASGI
+# entry point submit to the same executor and read from the same registry.
+
+MAX_JOBS = 1000                # Finished jobs kept for status polling
+EXECUTOR_KIND = os.environ.get('SMARTSTUDY_EXECUTOR', 'thread')
+EXECUTOR_WORKERS = int(os.environ.get('SMARTSTUDY_EXECUTOR_WORKERS', os.cpu_count() or 2))
+SSE_POLL_INTERVAL = 1.0        # Seconds between status checks on an event stream
+SSE_HEARTBEAT = 15.0           # Seconds between keep-alive comments on idle streams
+SSE_RETRY_MS = 2000            # Reconnect delay sent to browsers when a WSGI stream closes
+# Seconds a /jobs/hold job sleeps; 0 leaves the route off. Only for loadtest.py
+LOADTEST_HOLD_SECONDS = float(os.environ.get('SMARTSTUDY_LOADTEST_HOLD', 0))
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+_worker_processor = None
+
+
+def get_executor() -> Executor:
+    """Shared executor, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if EXECUTOR_KIND == 'process':
+                _executor = ProcessPoolExecutor(max_workers=EXECUTOR_WORKERS)
+            else:
+                _executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix='ai')
+        return _executor
+
+
+def run_ai(method: str, *args: Any, **kwargs: Any) -> Any:
+    """Call an AIProcessor method; module-level so process workers can unpickle it"""
+    global _worker_processor
+    if _worker_processor is None:
+        from ai_processor import AIProcessor
+        _worker_processor = AIProcessor()
+    return getattr(_worker_processor, method)(*args, **kwargs)
+
+
+def submit_ai(method: str, *args: Any, **kwargs: Any) -> Future:
+    return get_executor().submit(run_ai, method, *args, **kwargs)
+
+
+class JobRegistry:
+    """Tracks submitted jobs by id and owner, forgetting the oldest past MAX_JOBS"""
+
+    def __init__(self, max_jobs: int = MAX_JOBS):
+        self.max_jobs = max_jobs
+        self.jobs: Dict[str, Tuple[str, Future]] = OrderedDict()
+        self.by_owner: Dict[str, Set[str]] = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def submit(self, owner: str, method: str, *args: Any, **kwargs: Any) -> str:
+        return self.track(owner, submit_ai(method, *args, **kwargs))
+
+    def track(self, owner: str, future: Future) -> str:
+        """Register work already submitted to the executor"""
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            self.jobs[job_id] = (owner, future)
+            self.by_owner[owner].add(job_id)
+            while len(self.jobs) > self.max_jobs:
+                old_id, (old_owner, _) = self.jobs.popitem(last=False)
+                owned = self.by_owner[old_owner]
+                owned.discard(old_id)
+                if not owned:
+                    del self.by_owner[old_owner]
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Future]:
+        with self.lock:
+            entry = self.jobs.get(job_id)
+        return entry[1] if entry else None
+
+    def finished_for(self, owner: str) -> Set[str]:
+        """Ids of the owner's jobs that have completed"""
+        with self.lock:
+            owned = self.by_owner.get(owner, ())
+            return {job_id for job_id in owned if self.jobs[job_id][1].done()}
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """JSON-ready status of a job, or None if it is unknown"""
+        future = self.get(job_id)
+        if future is None:
+            return None
+        if not future.done():
+            return {'id': job_id, 'status': 'running' if future.running() else 'queued'}
+        error = future.exception()
+        if error is not None:
+            return {'id': job_id, 'status': 'failed', 'error': str(error)}
+        return {'id': job_id, 'status': 'done', 'result': future.result()}
+
+
+jobs = JobRegistry()
+
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """Encode one server-sent event"""
+    lines = [f'event: {event}'] if event else []
+    lines.extend(f'data: {line}' for line in json.dumps(data).splitlines())
+    return '\n'.join(lines) + '\n\n'
+
+
+def job_event(job_id: str) -> Optional[str]:
+    """Final event for a job, or None while it is still pending"""
+    status = jobs.status(job_id)
+    if status is None:
+        return format_sse({'id': job_id, 'status': 'unknown'}, event='done')
+    if status['status'] in ('done', 'failed'):
+        return format_sse(status, event='done')
+    return None
+
+
+def new_finished_jobs(owner: str, announced: Set[str]) -> Iterator[str]:
+    """Events for the owner's jobs that finished since the last call"""
+    finished = jobs.finished_for(owner)
+    for job_id in finished - announced:
+        status = jobs.status(job_id)
+        if status is not None:
+            yield format_sse(status, event='job')
+    announced |= finished
+
+
+def iter_job_events(job_id: str) -> Iterator[str]:
+    """SSE response with one job's current status, for the WSGI app.
+
+    Waiting for the job would hold a sync worker, so the stream sends the
+    status once and closes; the browser reconnects after SSE_RETRY_MS, and
+    other clients poll /jobs/<id>. See asgi.py for streams that stay open.
+    """
+    yield f'retry: {SSE_RETRY_MS}\n\n'
+    event = job_event(job_id)
+    yield event if event is not None else format_sse(jobs.status(job_id), event='status')
+
+
+def iter_text_chunks(text: str, words_per_chunk: int = 8):
+    """Split a response into word groups for streaming"""
+    words = text.split(' ')
+    for start in range(0, len(words), words_per_chunk):
+        chunk = ' '.join(words[start:start + words_per_chunk])
+        yield chunk if start + words_per_chunk >= len(words) else chunk + ' '
@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import json
+import resource
+import time
+import urllib.request
+
+# Concurrent connection capacity test for the event stream endpoints.
+#
+# Opens N connections to a streaming path and counts how many get response
+# headers within the timeout and stay open for the hold period. By default it
+# queues a /jobs/hold job, which only exists when SMARTSTUDY_LOADTEST_HOLD is
+# set, and streams /jobs/<id>/events for it. Compare:
+#   SMARTSTUDY_LOADTEST_HOLD=60 gunicorn --bind 0.0.0.0:5000 main:app        (sync workers)
+#   SMARTSTUDY_LOADTEST_HOLD=60 uvicorn --host 0.0.0.0 --port 5000 asgi:app  (ASGI)
+# then: python loadtest.py --connections 2000
+
+
+async def open_stream(host: str, port: int, path: str, timeout: float):
+    """Connect and wait for the status line; returns the open stream or None"""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n'.encode())
+    try:
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+    except (OSError, asyncio.TimeoutError):
+        writer.close()
+        return None
+    if b' 200 ' not in status_line:
+        writer.close()
+        return None
+    return reader, writer
+
+
+async def hold_stream(host: str, port: int, path: str, timeout: float, hold: float):
+    """Open a stream and read it until the server ends it or hold seconds pass.
+
+    Returns None if the stream never opened, otherwise when it opened and
+    whether it was still open. A stream the server ends is closed from this
+    side too, as a browser does, so the server is not left waiting on it.
+    """
+    stream = await open_stream(host, port, path, timeout)
+    if stream is None:
+        return None
+    reader, writer = stream
+    opened_at = time.perf_counter()
+
+    async def read_to_end():
+        try:
+            while await reader.read(65536):
+                pass
+        except OSError:
+            pass
+
+    try:
+        await asyncio.wait_for(read_to_end(), hold)
+        still_open = False
+    except asyncio.TimeoutError:
+        still_open = True
+    writer.close()
+    return opened_at, still_open
+
+
+def seed_hold_job(host: str, port: int) -> str:
+    """Queue a job that stays pending and return its event stream path"""
+    request = urllib.request.Request(f'http://{host}:{port}/jobs/hold', data=b'', method='POST')
+    with urllib.request.urlopen(request, timeout=10) as response:
+        job_id = json.load(response)['job_id']
+    return f'/jobs/{job_id}/events'
+
+
+async def run(host: str, port: int, path: str, connections: int, timeout: float, hold: float) -> None:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(hold_stream(host, port, path, timeout, hold) for _ in range(connections)))
+    opened = [result for result in results if result is not None]
+    elapsed = max((opened_at for opened_at, _ in opened), default=start) - start
+    print(f'{len(opened)}/{connections} streams established in {elapsed:.1f}s')
+    alive = sum(still_open for _, still_open in opened)
+    print(f'{alive}/{connections} streams still open after {hold:.0f}s')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure how many concurrent event streams a server holds')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--path', help='stream to open; defaults to the events of a freshly queued hold job')
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--timeout', type=float, default=10.0, help='seconds to wait for response headers')
+    parser.add_argument('--hold', type=float, default=10.0, help='seconds to keep the streams open')
+    args = parser.parse_args()
+
+    # Each connection needs a file descriptor
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, min(hard, args.connections + 256)), hard))
+
+    path = args.path or seed_hold_job(args.host, args.port)
+    print(f'Streaming {path}')
+    asyncio.run(run(args.host, args.port, path, args.connections, args.timeout, args.hold))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@
 
 // Global variables
 let currentUser = localStorage.getItem('smartstudy_user') || 'Student';
-let activityHistory = JSON.parse(localStorage.getItem('smartstudy_activity') || '[]');
+let activityHistory = [];
 let currentTheme = localStorage.getItem('smartstudy_theme') || 'dark';
 let notificationQueue = [];
 let isProcessing = false;
@@ -177,6 +177,242 @@ function saveUserPreference(key, value) {
     localStorage.setItem(`smartstudy_${key}`, value);
 }
 
+// Client storage - IndexedDB ring buffer for activity and drafts
+const ACTIVITY_CAP = 500;          // Fixed size of the on-device activity ring buffer
+const RECENT_ACTIVITY_COUNT = 10;  // Entries kept in memory for the activity widget
+const SYNC_BATCH_SIZE = 50;        // Max events per POST to the server
+const SYNC_INTERVAL = 15000;       // Flush pending events at most this often
+const DRAFT_SAVE_DELAY = 1000;     // Debounce for draft writes
+
+const activityStore = {
+    db: null,
+    ready: null,
+    opened: false,
+    writeQueue: [],
+    writeScheduled: false,
+    pendingSync: [],
+    syncTimer: null,
+
+    open() {
+        if (this.ready) return this.ready;
+        this.ready = new Promise((resolve) => {
+            if (!window.indexedDB) {
+                resolve(null);
+                return;
+            }
+            const request = indexedDB.open('smartstudy', 1);
+            request.onupgradeneeded = () => {
+                const db = request.result;
+                const activity = db.createObjectStore('activity', { keyPath: 'slot' });
+                activity.createIndex('seq', 'seq');
+                db.createObjectStore('drafts', { keyPath: 'formId' });
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(null);
+        }).then(db => {
+            this.db = db;
+            return this.hydrate();
+        }).then(() => this.db);
+        return this.ready;
+    },
+
+    // Restore the newest entries and any unsynced events
+    hydrate() {
+        if (!this.db) {
+            this.opened = true;
+            this.writeQueue = [];
+            activityHistory = activityHistory.concat(this.migrateLocalStorage()).slice(0, RECENT_ACTIVITY_COUNT);
+            updateActivityDisplay();
+            return Promise.resolve();
+        }
+
+        return new Promise((resolve) => {
+            const recent = [];
+            const tx = this.db.transaction('activity', 'readonly');
+            const cursorRequest = tx.objectStore('activity').index('seq').openCursor(null, 'prev');
+            cursorRequest.onsuccess = () => {
+                const cursor = cursorRequest.result;
+                if (!cursor) return;
+                const entry = cursor.value;
+                if (recent.length < RECENT_ACTIVITY_COUNT) {
+                    recent.push(entry.activity);
+                }
+                if (!entry.synced) {
+                    this.pendingSync.unshift(entry);
+                }
+                cursor.continue();
+            };
+            tx.oncomplete = tx.onerror = () => {
+                this.opened = true;
+                // Anything logged before the store opened is newer than what is on disk
+                const legacy = this.migrateLocalStorage();
+                activityHistory = activityHistory.concat(legacy, recent).slice(0, RECENT_ACTIVITY_COUNT);
+                if (activityHistory.length === 0) {
+                    this.pull();
+                }
+                updateActivityDisplay();
+                this.flushWrites();
+                this.scheduleSync();
+                resolve();
+            };
+        });
+    },
+
+    // One-time import of the old localStorage array (newest first)
+    migrateLocalStorage() {
+        const legacy = localStorage.getItem('smartstudy_activity');
+        if (!legacy) return [];
+        localStorage.removeItem('smartstudy_activity');
+        let activities = [];
+        try {
+            activities = JSON.parse(legacy).slice(0, ACTIVITY_CAP);
+        } catch (e) {
+            console.warn('Discarding unreadable activity history', e);
+        }
+        const entries = activities.slice().reverse().map(activity => ({ synced: 0, activity }));
+        this.writeQueue = entries.concat(this.writeQueue);
+        this.pendingSync = entries.concat(this.pendingSync);
+        this.scheduleSync();
+        return activities;
+    },
+
+    append(activity) {
+        const entry = { synced: 0, activity: activity };
+        this.writeQueue.push(entry);
+        this.pendingSync.push(entry);
+        this.scheduleWrite();
+        this.scheduleSync();
+    },
+
+    // Coalesce writes into one transaction off the critical path
+    scheduleWrite() {
+        if (this.writeScheduled) return;
+        this.writeScheduled = true;
+        const idle = window.requestIdleCallback || ((cb) => setTimeout(cb, 50));
+        idle(() => this.flushWrites());
+    },
+
+    flushWrites() {
+        this.writeScheduled = false;
+        // Migrated entries go to disk first, so nothing is written before the store is hydrated
+        if (!this.opened || this.writeQueue.length === 0) return;
+        if (!this.db) {
+            this.writeQueue = [];
+            return;
+        }
+        const entries = this.writeQueue;
+        this.writeQueue = [];
+        // Sequence numbers come from the newest entry on disk, read in the same readwrite
+        // transaction; transactions are serialized, so tabs sharing the database never collide
+        const store = this.db.transaction('activity', 'readwrite').objectStore('activity');
+        const newest = store.index('seq').openCursor(null, 'prev');
+        newest.onsuccess = () => {
+            let next = newest.result ? newest.result.value.seq + 1 : 0;
+            entries.forEach(entry => {
+                if (entry.seq === undefined) {
+                    entry.seq = next++;
+                    entry.slot = entry.seq % ACTIVITY_CAP;
+                }
+            });
+            entries.forEach(entry => {
+                // Skip updates whose slot has been reused by a newer entry
+                if (entry.seq >= next - ACTIVITY_CAP) store.put(entry);
+            });
+        };
+    },
+
+    markSynced(entries) {
+        entries.forEach(entry => { entry.synced = 1; });
+        // Entries still waiting for their first write pick up the flag then
+        const written = entries.filter(entry => entry.seq !== undefined);
+        if (!this.db || written.length === 0) return;
+        this.writeQueue.push(...written);
+        this.scheduleWrite();
+    },
+
+    scheduleSync() {
+        if (this.syncTimer || this.pendingSync.length === 0) return;
+        const delay = this.pendingSync.length >= SYNC_BATCH_SIZE ? 0 : SYNC_INTERVAL;
+        this.syncTimer = setTimeout(() => {
+            this.syncTimer = null;
+            this.sync();
+        }, delay);
+    },
+
+    sync() {
+        // While offline the 'online' listener below restarts syncing
+        if (this.pendingSync.length === 0 || !navigator.onLine) return;
+        const batch = this.pendingSync.splice(0, SYNC_BATCH_SIZE);
+        fetch('/activity/sync', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ events: batch.map(entry => entry.activity) }),
+            keepalive: true
+        }).then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            this.markSynced(batch);
+        }).catch(() => {
+            // Put the batch back in front; it is retried on the next flush
+            this.pendingSync = batch.concat(this.pendingSync);
+        }).finally(() => this.scheduleSync());
+    },
+
+    // Last-chance flush when the tab is hidden or closed
+    beacon() {
+        if (this.pendingSync.length === 0 || !navigator.sendBeacon) return;
+        const batch = this.pendingSync.slice(0, SYNC_BATCH_SIZE);
+        const body = new Blob([JSON.stringify({ events: batch.map(entry => entry.activity) })],
+                              { type: 'application/json' });
+        if (navigator.sendBeacon('/activity/sync', body)) {
+            this.pendingSync.splice(0, batch.length);
+            this.markSynced(batch);
+            this.flushWrites();
+        }
+    },
+
+    // Seed an empty device from activity already synced by another browser
+    pull() {
+        fetch('/activity', { headers: { 'Accept': 'application/json' } })
+            .then(response => response.ok ? response.json() : { events: [] })
+            .then(data => {
+                if (activityHistory.length > 0) return;
+                activityHistory = (data.events || []).slice(0, RECENT_ACTIVITY_COUNT);
+                updateActivityDisplay();
+            })
+            .catch(() => {});
+    },
+
+    saveDraft(formId, data) {
+        return this.open().then(db => {
+            if (!db) {
+                localStorage.setItem(`smartstudy_draft_${formId}`, JSON.stringify(data));
+                return;
+            }
+            db.transaction('drafts', 'readwrite').objectStore('drafts').put({ formId, ...data });
+        });
+    },
+
+    loadDraft(formId) {
+        return this.open().then(db => {
+            if (!db) {
+                const saved = localStorage.getItem(`smartstudy_draft_${formId}`);
+                return saved ? JSON.parse(saved) : null;
+            }
+            return new Promise((resolve) => {
+                const request = db.transaction('drafts', 'readonly').objectStore('drafts').get(formId);
+                request.onsuccess = () => resolve(request.result || null);
+                request.onerror = () => resolve(null);
+            });
+        });
+    }
+};
+
+activityStore.open();
+document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') activityStore.beacon();
+});
+window.addEventListener('online', () => activityStore.scheduleSync());
+
 // Activity tracking
 function logActivity(type, details) {
     const activity = {
@@ -189,12 +425,12 @@ function logActivity(type, details) {
     
     activityHistory.unshift(activity);
     
-    // Keep only last 100 activities
-    if (activityHistory.length > 100) {
-        activityHistory = activityHistory.slice(0, 100);
+    // Only the newest few stay in memory; the full log lives in IndexedDB
+    if (activityHistory.length > RECENT_ACTIVITY_COUNT) {
+        activityHistory.length = RECENT_ACTIVITY_COUNT;
     }
     
-    localStorage.setItem('smartstudy_activity', JSON.stringify(activityHistory));
+    activityStore.append(activity);
     updateActivityDisplay();
 }
 
@@ -261,33 +497,23 @@ function extractKeywords(text, count = 5) {
 function setupAutoSave() {
     const textareas = document.querySelectorAll('textarea');
     textareas.forEach(textarea => {
-        let saveTimeout;
         textarea.addEventListener('input', function() {
-            clearTimeout(saveTimeout);
-            saveTimeout = setTimeout(() => {
-                saveFormData(this);
-            }, 2000);
+            saveFormData(this);
         });
     });
 }
 
 function saveFormData(element) {
     const formId = element.closest('form')?.id || 'default';
-    const data = {
-        value: element.value,
-        timestamp: Date.now()
-    };
-    localStorage.setItem(`smartstudy_draft_${formId}`, JSON.stringify(data));
-    showSaveIndicator();
+    const value = element.value;
+    optimizedDebounce(() => {
+        activityStore.saveDraft(formId, { value: value, timestamp: Date.now() })
+            .then(showSaveIndicator);
+    }, DRAFT_SAVE_DELAY, `draft_${formId}`);
 }
 
 function loadFormData(formId) {
-    const saved = localStorage.getItem(`smartstudy_draft_${formId}`);
-    if (saved) {
-        const data = JSON.parse(saved);
-        return data.value;
-    }
-    return '';
+    return activityStore.loadDraft(formId).then(data => data ? data.value : '');
 }
 
 function showSaveIndicator() {
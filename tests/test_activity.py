@@ -0,0 +1,124 @@
+import logging
+from collections import OrderedDict
+
+import pytest
+
+import app as app_module
+
+logging.disable(logging.CRITICAL)
+
+
+@pytest.fixture(autouse=True)
+def fresh_log(monkeypatch):
+    monkeypatch.setattr(app_module, 'activity_log', OrderedDict())
+    monkeypatch.setattr(app_module, 'activity_size', 0)
+
+
+def new_client():
+    """A test client whose session already holds its key"""
+    client = app_module.app.test_client()
+    client.get('/dashboard')
+    return client
+
+
+def sync(client, events):
+    return client.post('/activity/sync', json={'events': events})
+
+
+def event(i, **fields):
+    return {'type': 'quiz', 'details': f'event {i}', 'timestamp': f'2025-08-01T12:00:{i:02}Z', **fields}
+
+
+def test_sync_and_read_back_newest_first():
+    client = new_client()
+    assert sync(client, [event(1), event(2)]).get_json() == {'accepted': 2}
+    events = client.get('/activity').get_json()['events']
+    assert [e['details'] for e in events] == ['event 2', 'event 1']
+    assert client.get('/activity?limit=1').get_json()['events'] == events[:1]
+
+
+def test_fields_are_truncated_and_extras_dropped():
+    client = new_client()
+    sync(client, [{'type': 't' * 80, 'details': 'd' * 300, 'timestamp': 's' * 60, 'user': 'someone'}])
+    stored = client.get('/activity').get_json()['events'][0]
+    assert stored == {'type': 't' * 50, 'details': 'd' * 200, 'timestamp': 's' * 40}
+
+
+def test_batch_limit_and_non_dict_events():
+    client = new_client()
+    batch = [event(i % 60) for i in range(app_module.ACTIVITY_BATCH_LIMIT + 20)]
+    batch[0] = 'not an event'
+    response = sync(client, batch)
+    assert response.get_json() == {'accepted': app_module.ACTIVITY_BATCH_LIMIT - 1}
+
+
+@pytest.mark.parametrize('payload', [[1, 2], 'x', 3, None, {'events': 'x'}, {}])
+def test_malformed_payloads_are_rejected(payload):
+    client = new_client()
+    response = client.post('/activity/sync', json=payload)
+    assert response.status_code == 400
+
+
+def test_sync_without_session_is_refused():
+    client = app_module.app.test_client()
+    response = sync(client, [event(1)])
+    assert response.status_code == 409
+    assert app_module.activity_log == {}
+    # The refusal hands out the cookie, so the retry goes through
+    assert sync(client, [event(1)]).status_code == 200
+
+
+def test_per_user_limit(monkeypatch):
+    monkeypatch.setattr(app_module, 'ACTIVITY_LOG_LIMIT', 5)
+    client = new_client()
+    sync(client, [event(i) for i in range(8)])
+    events = client.get('/activity').get_json()['events']
+    assert [e['details'] for e in events] == [f'event {i}' for i in (7, 6, 5, 4, 3)]
+
+
+def test_least_recently_synced_user_is_evicted(monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_ACTIVITY_USERS', 2)
+    first, second, third = new_client(), new_client(), new_client()
+    sync(first, [event(1)])
+    sync(second, [event(2)])
+    sync(first, [event(3)])
+    sync(third, [event(4)])
+    assert len(first.get('/activity').get_json()['events']) == 2
+    assert second.get('/activity').get_json()['events'] == []
+    assert len(third.get('/activity').get_json()['events']) == 1
+
+
+def test_total_bytes_are_bounded(monkeypatch):
+    client = new_client()
+    sync(client, [event(1)])
+    per_event = app_module.activity_size
+    monkeypatch.setattr(app_module, 'MAX_ACTIVITY_BYTES', per_event * 10)
+
+    clients = [new_client() for _ in range(6)]
+    for test_client in clients:
+        sync(test_client, [event(i) for i in range(3)])
+    assert app_module.activity_size <= per_event * 10
+    assert sum(len(log) for log in app_module.activity_log.values()) * per_event == app_module.activity_size
+    # The newest syncs are kept
+    assert len(clients[-1].get('/activity').get_json()['events']) == 3
+    assert client.get('/activity').get_json()['events'] == []
+
+
+def test_signing_in_as_someone_else_does_not_reach_their_data():
+    owner = new_client()
+    owner.post('/signin', data={'email': 'owner@example.com', 'password': 'secret'})
+    sync(owner, [event(1)])
+
+    intruder = new_client()
+    intruder.post('/signin', data={'email': 'owner@example.com', 'password': 'anything'})
+    assert intruder.get('/activity').get_json()['events'] == []
+    assert len(owner.get('/activity').get_json()['events']) == 1
+
+
+def test_signing_in_starts_a_new_key():
+    client = new_client()
+    with client.session_transaction() as session:
+        anonymous = session['client_id']
+    client.post('/signin', data={'email': 'user@example.com', 'password': 'secret'})
+    with client.session_transaction() as session:
+        assert session['client_id'] != anonymous
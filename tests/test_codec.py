@@ -0,0 +1,148 @@
+import pytest
+
+from codec import MAGIC, ActivityEvent, ChatTurn, CodecError, Flashcard, decode, encode
+
+
+def body(value):
+    """Encoded bytes without the magic prefix"""
+    return encode(value)[len(MAGIC):]
+
+
+@pytest.mark.parametrize('value', [
+    None, True, False, 0, 1, -1, 3.5, -0.0, '', 'plain', 'ünïcødé ✓', b'', b'\x00\xff',
+    [], {}, [1, 'two', None, [3.0]], {'front': 'q', 'not a field': 2, 7: 'int key'},
+])
+def test_scalar_and_container_round_trip(value):
+    assert decode(encode(value)) == value
+
+
+def test_tuples_decode_as_lists():
+    assert decode(encode((1, 2))) == [1, 2]
+
+
+@pytest.mark.parametrize('record', [
+    Flashcard('What is ATP?', 'The energy currency of the cell'),
+    ChatTurn('hi', 'hello'),
+    ActivityEvent('quiz', 'Scored 4/5', '2025-08-01T12:00:00Z'),
+    Flashcard(None, None),
+])
+def test_record_round_trip(record):
+    decoded = decode(encode(record))
+    assert type(decoded) is type(record)
+    assert decoded == record
+
+
+def test_nested_records_round_trip():
+    deck = [Flashcard('q', ['a', 'b'])] * 3
+    payload = {'deck': deck, 'history': [ChatTurn('a', 'b'), {'user': 'c', 'assistant': 'd'}]}
+    assert decode(encode(payload)) == payload
+
+
+def test_records_are_smaller_than_maps():
+    card = Flashcard('front text', 'back text')
+    assert len(encode(card)) < len(encode(card.to_dict()))
+
+
+@pytest.mark.parametrize('length, header', [
+    (31, b'\xbf'),
+    (32, b'\xd9\x20'),
+    (255, b'\xd9\xff'),
+    (256, b'\xda\x01\x00'),
+    (65535, b'\xda\xff\xff'),
+    (65536, b'\xdb\x00\x01\x00\x00'),
+])
+def test_string_size_boundaries(length, header):
+    value = 'x' * length
+    encoded = body(value)
+    assert encoded.startswith(header)
+    assert len(encoded) == len(header) + length
+    assert decode(encode(value)) == value
+
+
+@pytest.mark.parametrize('length, header', [
+    (15, b'\x9f'),
+    (16, b'\xdc\x00\x10'),
+    (65535, b'\xdc\xff\xff'),
+    (65536, b'\xdd\x00\x01\x00\x00'),
+])
+def test_array_size_boundaries(length, header):
+    value = [0] * length
+    assert body(value).startswith(header)
+    assert decode(encode(value)) == value
+
+
+@pytest.mark.parametrize('length, header', [
+    (15, b'\x8f'),
+    (16, b'\xde\x00\x10'),
+    (65535, b'\xde\xff\xff'),
+    (65536, b'\xdf\x00\x01\x00\x00'),
+])
+def test_map_size_boundaries(length, header):
+    value = {i: 0 for i in range(length)}
+    assert body(value).startswith(header)
+    assert decode(encode(value)) == value
+
+
+def test_bytes_size_boundaries():
+    for length, header in ((255, b'\xc4\xff'), (256, b'\xc5\x01\x00'), (65536, b'\xc6\x00\x01\x00\x00')):
+        value = b'\x01' * length
+        assert body(value).startswith(header)
+        assert decode(encode(value)) == value
+
+
+@pytest.mark.parametrize('value, size', [
+    (127, 1),
+    (128, 9),
+    (-32, 1),
+    (-33, 9),
+    ((1 << 63) - 1, 9),
+    (-(1 << 63), 9),
+])
+def test_integer_boundaries(value, size):
+    assert len(body(value)) == size
+    assert decode(encode(value)) == value
+
+
+@pytest.mark.parametrize('value', [1 << 63, -(1 << 63) - 1])
+def test_integer_out_of_range(value):
+    with pytest.raises(CodecError):
+        encode(value)
+
+
+def test_unsupported_type():
+    with pytest.raises(CodecError):
+        encode({1, 2})
+
+
+def test_bad_magic():
+    with pytest.raises(CodecError):
+        decode(b'{"front": "q"}')
+
+
+def test_trailing_data():
+    with pytest.raises(CodecError, match='Trailing'):
+        decode(encode('ok') + b'\x00')
+
+
+def test_every_truncation_is_rejected():
+    data = encode({'deck': [Flashcard('q' * 40, ['é', 300, None])], 'turn': ChatTurn('hi', 'x' * 300),
+                   'blob': b'\x00' * 300, 'ratio': 0.5})
+    for cut in range(len(MAGIC), len(data)):
+        with pytest.raises(CodecError, match='Truncated'):
+            decode(data[:cut])
+
+
+@pytest.mark.parametrize('kind', [1, 2, 3, 5, 6, 0xfe])
+def test_unknown_record_kind(kind):
+    with pytest.raises(CodecError):
+        decode(MAGIC + bytes([0xc7, kind, 0]))
+
+
+def test_unknown_type_code():
+    with pytest.raises(CodecError):
+        decode(MAGIC + b'\xc1\x00')
+
+
+def test_unknown_field_tag():
+    with pytest.raises(CodecError):
+        decode(MAGIC + b'\x81\xc1\xff\xc0')
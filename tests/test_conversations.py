@@ -0,0 +1,207 @@
+import logging
+import threading
+
+import pytest
+
+import conversations
+from codec import ChatTurn
+from conversations import ConversationContext, ConversationStore, is_follow_up, is_recap_request
+
+logging.disable(logging.CRITICAL)
+
+
+def never_summarize(text):
+    raise AssertionError('summarize called while chatting')
+
+
+@pytest.mark.parametrize('message', [
+    'explain that again',
+    'Can you repeat that?',
+    'Tell me more',
+    'Could you elaborate on the second point please?',
+    'Say it simpler',
+    'Give me another example of how this works in practice',
+    'go back to the previous one',
+    'And that?',
+    'why is it important',
+    'explain this',
+])
+def test_follow_ups(message):
+    assert is_follow_up(message)
+
+
+@pytest.mark.parametrize('message', [
+    'What is it like before an exam?',
+    'What is that?',
+    'How does it work?',
+    'What are the best study habits to build before the semester starts?',
+    'Tell me about calculus',
+    'I want to learn more about the French revolution and its causes',
+    'hello',
+])
+def test_not_follow_ups(message):
+    assert not is_follow_up(message)
+
+
+@pytest.mark.parametrize('message, expected', [
+    ('What did we talk about?', True),
+    ('Can you summarize our conversation', True),
+    ('what have we covered so far', True),
+    ('Summarize the French revolution', False),
+])
+def test_recap_requests(message, expected):
+    assert is_recap_request(message) is expected
+
+
+def test_resolve_follow_up_uses_recent_topics():
+    context = ConversationContext()
+    assert context.resolve_follow_up('explain that again') is None
+
+    context.add_turn(ChatTurn('What is photosynthesis?', '...'), 'photosynthesis', never_summarize)
+    assert context.resolve_follow_up('explain that again') == 'photosynthesis'
+    assert context.resolve_follow_up('go back to the previous one') == 'photosynthesis'
+
+    context.add_turn(ChatTurn('Tell me about calculus', '...'), 'calculus', never_summarize)
+    context.add_turn(ChatTurn('hello', '...'), None, never_summarize)
+    assert context.resolve_follow_up('explain that again') == 'calculus'
+    assert context.resolve_follow_up('go back to the previous one') == 'photosynthesis'
+    assert context.resolve_follow_up('What is it like before an exam?') is None
+
+
+def test_topics_are_bounded(monkeypatch):
+    monkeypatch.setattr(conversations, 'MAX_TOPICS', 3)
+    context = ConversationContext()
+    for topic in ['a', 'b', 'c', 'a', 'd']:
+        context.add_turn(ChatTurn(topic, topic), topic, never_summarize)
+    assert list(context.topics) == ['c', 'a', 'd']
+
+
+def test_summary_is_built_on_read():
+    context = ConversationContext()
+    calls = []
+
+    def summarize(text):
+        calls.append(text)
+        return f'summary {len(calls)}'
+
+    for i in range(conversations.RECENT_TURNS + 3):
+        context.add_turn(ChatTurn(f'question {i}', f'answer {i}'), None, never_summarize)
+    assert len(context.turns()) == conversations.RECENT_TURNS
+    assert calls == []
+
+    assert context.earlier_summary(summarize) == 'summary 1'
+    assert 'question 0. answer 0' in calls[0] and 'question 2. answer 2' in calls[0]
+    assert 'question 3' not in calls[0]
+
+    # Cached until more turns leave the verbatim window
+    assert context.earlier_summary(summarize) == 'summary 1'
+    context.add_turn(ChatTurn('question x', 'answer x'), None, never_summarize)
+    assert context.earlier_summary(summarize) == 'summary 2'
+    assert calls[1].startswith('summary 1 question 3. answer 3')
+
+
+def test_summary_is_bounded():
+    context = ConversationContext()
+    for i in range(conversations.RECENT_TURNS + conversations.MAX_PENDING_TURNS - 1):
+        context.add_turn(ChatTurn(f'q{i}', 'a'), None, never_summarize)
+    context.add_turn(ChatTurn('last', 'a'), None, lambda text: 'Sentence one. ' * 200)
+    assert not context.pending
+
+    summary = context.earlier_summary(never_summarize)
+    assert len(summary) <= conversations.MAX_SUMMARY_CHARS
+    assert summary.startswith('Sentence one.')
+
+
+def test_full_pending_list_is_summarized_not_dropped():
+    context = ConversationContext()
+    calls = []
+
+    def summarize(text):
+        calls.append(text)
+        return f'summary {len(calls)}'
+
+    for i in range(conversations.RECENT_TURNS + 2 * conversations.MAX_PENDING_TURNS + 3):
+        context.add_turn(ChatTurn(f'question {i}', 'answer'), None, summarize)
+    # One summary per full pending list, each carrying the previous one forward
+    assert len(calls) == 2
+    assert 'question 0. answer' in calls[0] and f'question {conversations.MAX_PENDING_TURNS - 1}.' in calls[0]
+    assert calls[1].startswith(f'summary 1 question {conversations.MAX_PENDING_TURNS}. answer')
+    assert len(context.pending) == 3
+
+    assert context.earlier_summary(summarize) == 'summary 3'
+    assert calls[2].startswith(f'summary 2 question {2 * conversations.MAX_PENDING_TURNS}. answer')
+
+
+def test_recap():
+    context = ConversationContext()
+    assert "haven't talked" in context.recap(never_summarize)
+
+    context.add_turn(ChatTurn('What is photosynthesis?', '...'), 'photosynthesis', never_summarize)
+    context.add_turn(ChatTurn('Tell me about calculus', '...'), 'calculus', never_summarize)
+    recap = context.recap(never_summarize)
+    assert 'calculus, photosynthesis' in recap
+    assert 'Tell me about calculus' in recap
+
+
+def test_concurrent_turns_are_all_recorded():
+    context = ConversationContext()
+    barrier = threading.Barrier(8)
+
+    def chat(n):
+        barrier.wait()
+        for i in range(200):
+            context.add_turn(ChatTurn(f'{n}-{i}', 'a'), f'topic {n}', lambda text: text[-100:])
+
+    threads = [threading.Thread(target=chat, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert context.turn_count == 1600
+    assert len(context.topics) == 8
+
+
+def test_store_evicts_least_recently_used():
+    store = ConversationStore(max_conversations=2)
+    first = store.get('a')
+    store.get('b')
+    assert store.get('a') is first
+    store.get('c')
+    assert store.peek('b') is None
+    assert store.peek('a') is first
+    store.clear('a')
+    assert store.peek('a') is None
+
+
+@pytest.fixture
+def client():
+    from app import app
+    return app.test_client()
+
+
+def chat(client, message):
+    assert client.post('/assistant/chat', data={'message': message}).status_code == 302
+
+
+def test_assistant_follow_up_flow(client):
+    from app import ai_processor, conversations as store
+    chat(client, 'What is photosynthesis?')
+    chat(client, 'explain that again')
+    chat(client, 'What is it like before an exam?')
+    chat(client, 'What did we talk about?')
+
+    with client.session_transaction() as session:
+        key = session['client_id']
+        assert session['questions_count'] == 4
+    turns = store.peek(key).turns()
+    photosynthesis = ai_processor.assistant_topics['photosynthesis']['response']
+    assert turns[1].assistant == f'Sure, here it is again: {photosynthesis}'
+    assert 'Sure, here it is again' not in turns[2].assistant
+    assert turns[3].assistant.startswith("So far we've covered: photosynthesis.")
+
+
+def test_history_shows_earlier_summary(client):
+    for i in range(conversations.RECENT_TURNS + 2):
+        chat(client, f'Tell me about topic number {i}. It matters for the exam.')
+    page = client.get('/history').get_data(as_text=True)
+    assert 'Earlier in the conversation' in page
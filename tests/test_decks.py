@@ -0,0 +1,213 @@
+import io
+import logging
+
+import pytest
+
+import decks
+from codec import Flashcard
+from decks import DeckFormatError, detect_format, iter_export, iter_import_batches
+
+logging.disable(logging.CRITICAL)
+
+
+def export_text(cards, fmt):
+    return ''.join(iter_export(cards, fmt))
+
+
+def import_text(text, fmt):
+    return [card for batch in iter_import_batches(io.StringIO(text, newline=''), fmt) for card in batch]
+
+
+def import_bytes(data, fmt):
+    stream = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8-sig', newline='')
+    return [card for batch in iter_import_batches(stream, fmt) for card in batch]
+
+
+TRICKY_CARDS = [
+    Flashcard('#1 rule', 'x'),
+    Flashcard('#separator:comma', 'looks like a header'),
+    Flashcard('Plain', 'Answer'),
+    Flashcard('Comma, and "quotes"', 'Tab\tinside'),
+    Flashcard('Multi\nline', 'Back with\r\nCRLF'),
+    Flashcard('#not a header', 'ünïcødé ✓'),
+    Flashcard('Semi;colon|pipe', ''),
+]
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'anki'])
+def test_round_trip(fmt):
+    assert import_text(export_text(TRICKY_CARDS, fmt), fmt) == TRICKY_CARDS
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'anki'])
+def test_round_trip_through_bytes(fmt):
+    data = export_text(TRICKY_CARDS, fmt).encode('utf-8')
+    assert import_bytes(data, fmt) == TRICKY_CARDS
+    assert import_bytes(b'\xef\xbb\xbf' + data, fmt) == TRICKY_CARDS
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'anki'])
+def test_round_trip_across_batches(fmt, monkeypatch):
+    monkeypatch.setattr(decks, 'EXPORT_CHUNK_ROWS', 7)
+    monkeypatch.setattr(decks, 'IMPORT_BATCH_SIZE', 5)
+    cards = [Flashcard(f'Q{i}', f'A{i}') for i in range(23)]
+    chunks = list(iter_export(cards, fmt))
+    assert len(chunks) == 4
+    batches = list(iter_import_batches(io.StringIO(''.join(chunks), newline=''), fmt))
+    assert [len(batch) for batch in batches] == [5, 5, 5, 5, 3]
+    assert [card for batch in batches for card in batch] == cards
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'anki'])
+def test_empty_deck_exports_header(fmt):
+    text = export_text([], fmt)
+    assert text
+    assert import_text(text, fmt) == []
+
+
+def test_anki_header():
+    text = export_text([Flashcard('front', 'back')], 'anki')
+    assert text.startswith('#separator:tab\n#html:false\n#columns:Front\tBack\n')
+
+
+@pytest.mark.parametrize('separator, delimiter', [
+    ('tab', '\t'), ('Comma', ','), ('semicolon', ';'), ('pipe', '|'), (':', ':'),
+])
+def test_anki_separator_header(separator, delimiter):
+    text = f'#separator:{separator}\n#html:false\nfront{delimiter}back\n'
+    assert import_text(text, 'anki') == [Flashcard('front', 'back')]
+
+
+def test_anki_without_header():
+    assert import_text('a\tb\nc\td\n', 'anki') == [Flashcard('a', 'b'), Flashcard('c', 'd')]
+
+
+def test_anki_hash_lines_that_are_not_headers_are_cards():
+    text = '#separator:tab\n#html:false\n#1 rule\tx\n#2 rule\ty\n'
+    assert import_text(text, 'anki') == [Flashcard('#1 rule', 'x'), Flashcard('#2 rule', 'y')]
+    assert import_text('#1 rule\tx\n', 'anki') == [Flashcard('#1 rule', 'x')]
+
+
+def test_hash_fronts_are_quoted_on_export():
+    text = export_text([Flashcard('#1 rule', 'x'), Flashcard('b', 'c')], 'anki')
+    assert text.endswith('"#1 rule"\t"x"\nb\tc\n')
+
+
+def test_csv_without_header_keeps_first_row():
+    assert import_text('a,b\nc,d\n', 'csv') == [Flashcard('a', 'b'), Flashcard('c', 'd')]
+
+
+def test_short_and_blank_rows_are_skipped():
+    assert import_text('front,back\n\nonly one\n,back only\na,b,extra\n', 'csv') == [Flashcard('a', 'b')]
+
+
+def test_unsupported_format():
+    with pytest.raises(DeckFormatError):
+        list(iter_import_batches(io.StringIO(''), 'apkg'))
+    with pytest.raises(DeckFormatError):
+        list(iter_export([], 'apkg'))
+
+
+@pytest.mark.parametrize('fmt, data', [
+    ('csv', b'front,back\n\xff\xfe,bad\n'),
+    ('csv', b'\xff\xfe,header\n'),
+    ('anki', b'#separator:tab\na\tb\n\xff\tbad\n'),
+    ('anki', b'#separator:\xff\na\tb\n'),
+], ids=['csv-row', 'csv-header', 'anki-row', 'anki-header'])
+def test_invalid_utf8(fmt, data):
+    with pytest.raises(DeckFormatError):
+        import_bytes(data, fmt)
+
+
+@pytest.mark.parametrize('fmt, text', [
+    ('csv', 'front,back\n"' + 'x' * 200000 + '",b\n'),
+    ('csv', '"' + 'x' * 200000 + '",b\n'),
+    ('anki', '#separator:tab\n' + 'x' * 200000 + '\tb\n'),
+    ('anki', 'x' * 200000 + '\tb\n'),
+], ids=['csv-row', 'csv-header', 'anki-row', 'anki-first-row'])
+def test_oversized_field(fmt, text):
+    with pytest.raises(DeckFormatError):
+        import_text(text, fmt)
+
+
+@pytest.mark.parametrize('cards', [23, 25])
+def test_card_limit(cards, monkeypatch):
+    monkeypatch.setattr(decks, 'IMPORT_BATCH_SIZE', 10)
+    monkeypatch.setattr(decks, 'MAX_IMPORT_CARDS', 22)
+    text = export_text([Flashcard(f'Q{i}', f'A{i}') for i in range(cards)], 'csv')
+    with pytest.raises(DeckFormatError, match='22 cards'):
+        import_text(text, 'csv')
+
+
+def test_card_limit_is_inclusive(monkeypatch):
+    monkeypatch.setattr(decks, 'MAX_IMPORT_CARDS', 3)
+    text = export_text([Flashcard(f'Q{i}', f'A{i}') for i in range(3)], 'csv')
+    assert len(import_text(text, 'csv')) == 3
+
+
+def test_detect_format():
+    assert detect_format('deck.CSV') == 'csv'
+    assert detect_format('deck.txt') == 'anki'
+    assert detect_format('deck.txt', 'csv') == 'csv'
+    assert detect_format('deck.csv', 'bogus') == 'csv'
+
+
+@pytest.fixture
+def client():
+    from app import app
+    return app.test_client()
+
+
+def upload(client, data, filename):
+    return client.post('/flashcards/import', data={'file': (io.BytesIO(data), filename)},
+                       content_type='multipart/form-data')
+
+
+def test_import_route_round_trip(client):
+    data = export_text(TRICKY_CARDS, 'anki').encode('utf-8')
+    assert upload(client, data, 'deck.txt').status_code == 302
+    exported = client.get('/flashcards/export?format=csv').get_data(as_text=True)
+    assert import_text(exported, 'csv') == TRICKY_CARDS
+
+
+@pytest.mark.parametrize('data, filename', [
+    (b'\xff\xfe\x00garbage', 'deck.csv'),
+    (b'#separator:tab\n\xff\xfe', 'deck.txt'),
+    (b'"' + b'x' * 200000 + b'",b\n', 'deck.csv'),
+    (b'', 'deck.csv'),
+], ids=['binary', 'bad-header', 'oversized-field', 'empty'])
+def test_import_route_rejects_bad_decks(client, data, filename):
+    response = upload(client, data, filename)
+    assert response.status_code == 200
+    assert b'text-red-700' in response.data
+
+
+def test_deck_store_is_bounded(monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'flashcard_decks', type(app_module.flashcard_decks)())
+    monkeypatch.setattr(app_module, 'MAX_STORED_DECKS', 3)
+    two_cards = app_module.deck_size([Flashcard('a', 'b'), Flashcard('c', 'd')])
+    monkeypatch.setattr(app_module, 'MAX_STORED_DECK_BYTES', two_cards * 5)
+    clients = [app_module.app.test_client() for _ in range(5)]
+
+    def has_deck(test_client):
+        return test_client.get('/flashcards/export?format=csv').get_data(as_text=True) != 'front,back\n'
+
+    for test_client in clients[:4]:
+        assert upload(test_client, b'a,b\nc,d\n', 'deck.csv').status_code == 302
+    assert [has_deck(test_client) for test_client in clients[:4]] == [False, True, True, True]
+
+    # Viewing a deck marks it as recently used, so clients[2] and clients[3] are dropped instead
+    clients[1].get('/flashcards')
+    big_deck = ''.join(f'q{i},a{i}\n' for i in range(7)).encode('utf-8')
+    assert upload(clients[4], big_deck, 'deck.csv').status_code == 302
+    assert sum(size for _, size in app_module.flashcard_decks.values()) <= two_cards * 5
+    assert [has_deck(test_client) for test_client in clients[1:]] == [True, False, False, True]
+
+
+def test_upload_size_is_limited(client, monkeypatch):
+    from app import app
+    monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 1024)
+    response = upload(client, b'a,b\n' * 1000, 'deck.csv')
+    assert response.status_code == 413
+    assert b'text-red-700' in response.data
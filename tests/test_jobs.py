@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import threading
+import time
+
+import pytest
+
+import jobs
+from jobs import format_sse, iter_job_events, iter_text_chunks
+
+logging.disable(logging.CRITICAL)
+
+
+def test_format_sse():
+    assert format_sse({'a': 1}) == 'data: {"a": 1}\n\n'
+    assert format_sse('x', event='done') == 'event: done\ndata: "x"\n\n'
+
+
+def test_text_chunks_rebuild_the_text():
+    text = 'one two three four five six seven eight nine ten'
+    chunks = list(iter_text_chunks(text, words_per_chunk=3))
+    assert len(chunks) == 4
+    assert ''.join(chunks) == text
+
+
+def test_job_stream_reports_the_result():
+    job_id = jobs.jobs.submit('owner-result', 'summarize_text', 'First sentence. Second sentence.')
+    jobs.jobs.get(job_id).result(5)
+    events = list(iter_job_events(job_id))
+    assert events[0] == f'retry: {jobs.SSE_RETRY_MS}\n\n'
+    assert events[-1].startswith('event: done\n')
+    assert '"status": "done"' in events[-1]
+
+
+def test_pending_job_stream_sends_the_status_once():
+    release = threading.Event()
+    job_id = jobs.jobs.track('owner-pending', jobs.get_executor().submit(release.wait, 5))
+    try:
+        start = time.monotonic()
+        events = list(iter_job_events(job_id))
+        assert time.monotonic() - start < jobs.SSE_POLL_INTERVAL
+        assert events[0] == f'retry: {jobs.SSE_RETRY_MS}\n\n'
+        assert events[1].startswith('event: status\n')
+        assert len(events) == 2
+    finally:
+        release.set()
+
+
+def test_unknown_job_stream():
+    events = list(iter_job_events('missing'))
+    assert '"status": "unknown"' in events[-1]
+
+
+@pytest.fixture
+def client():
+    from app import app
+    return app.test_client()
+
+
+def test_wsgi_user_events_point_to_asgi(client):
+    response = client.get('/events')
+    assert response.status_code == 501
+    assert 'asgi:app' in response.get_json()['error']
+
+
+def test_wsgi_job_events_set_a_retry_delay(client):
+    response = client.get('/jobs/missing/events')
+    assert response.mimetype == 'text/event-stream'
+    body = response.get_data(as_text=True)
+    assert body.startswith(f'retry: {jobs.SSE_RETRY_MS}\n\n')
+    assert '"status": "unknown"' in body
+
+
+def test_hold_jobs_are_off_by_default(client):
+    assert client.post('/jobs/hold').status_code == 404
+
+
+def test_hold_job(client, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'LOADTEST_HOLD_SECONDS', 0.01)
+    response = client.post('/jobs/hold')
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    jobs.jobs.get(job_id).result(5)
+    assert client.get(f'/jobs/{job_id}').get_json()['status'] == 'done'
+
+
+def run_asgi(path, messages):
+    """Call the ASGI app and return what it sent and the tasks it left running"""
+    asgi = pytest.importorskip('asgi')
+
+    async def call():
+        sent = []
+        queue = list(messages)
+
+        async def receive():
+            if queue:
+                return queue.pop(0)
+            await asyncio.sleep(0.05)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'path': path, 'method': 'GET', 'headers': []}
+        await asyncio.wait_for(asgi.app(scope, receive, send), 5)
+        await asyncio.sleep(0)
+        current = asyncio.current_task()
+        return sent, [task for task in asyncio.all_tasks() if task is not current and not task.done()]
+
+    return asyncio.run(call())
+
+
+def test_asgi_user_events_stop_on_disconnect():
+    pytest.importorskip('asgiref')
+    sent, leftover = run_asgi('/events', [{'type': 'http.request', 'body': b'', 'more_body': False}])
+    assert sent[0]['status'] == 200
+    assert leftover == []
+
+
+def test_asgi_job_events_cancel_the_watcher():
+    pytest.importorskip('asgiref')
+    sent, leftover = run_asgi('/jobs/missing/events', [])
+    assert b'"unknown"' in sent[-1]['body']
+    assert leftover == []